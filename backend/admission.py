@@ -0,0 +1,157 @@
+import asyncio
+from collections import deque
+from typing import Dict
+
+from fastapi import Depends, HTTPException
+
+
+class RequestClass:
+    """Concurrency limit, wait queue and counters for one class of routes."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, deadline: float, priority: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.priority = priority
+        self.active = 0
+        self.waiters: deque = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "priority": self.priority,
+            "active": self.active,
+            "queue_length": len(self.waiters),
+            "max_queue": self.max_queue,
+            "deadline": self.deadline,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait": self.total_wait / self.queued if self.queued else 0.0,
+        }
+
+
+class AdmissionController:
+    """Admits requests per class under a shared concurrency budget.
+
+    Each class has its own limit and bounded queue. When a slot frees up,
+    waiters of the highest-priority class (lowest number) are woken first.
+    A full queue is rejected with 429; a request still queued after its
+    class deadline is shed with 503.
+    """
+
+    def __init__(self, total_limit: int):
+        self.total_limit = total_limit
+        self.total_active = 0
+        self.classes: Dict[str, RequestClass] = {}
+        self._order = []
+
+    def add_class(self, name: str, limit: int, max_queue: int, deadline: float, priority: int) -> None:
+        self.classes[name] = RequestClass(name, limit, max_queue, deadline, priority)
+        self._order = sorted(self.classes.values(), key=lambda c: c.priority)
+
+    def _can_run(self, request_class: RequestClass) -> bool:
+        if request_class.active >= request_class.limit or self.total_active >= self.total_limit:
+            return False
+        # Don't jump ahead of queued work of equal or higher priority, unless
+        # it is only waiting on its own class limit rather than the total
+        for other in self._order:
+            if other.priority > request_class.priority:
+                break
+            if other.waiters and other.active < other.limit:
+                return False
+        return True
+
+    def _start(self, request_class: RequestClass) -> None:
+        request_class.active += 1
+        request_class.admitted += 1
+        self.total_active += 1
+
+    def _wake(self) -> None:
+        for request_class in self._order:
+            while (request_class.waiters
+                   and request_class.active < request_class.limit
+                   and self.total_active < self.total_limit):
+                waiter = request_class.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._start(request_class)
+                waiter.set_result(None)
+            if self.total_active >= self.total_limit:
+                return
+
+    async def acquire(self, name: str) -> None:
+        request_class = self.classes[name]
+        if self._can_run(request_class):
+            self._start(request_class)
+            return
+
+        if len(request_class.waiters) >= request_class.max_queue:
+            request_class.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        request_class.waiters.append(waiter)
+        request_class.queued += 1
+        started = loop.time()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), request_class.deadline)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Admitted just as the deadline fired; hand the slot back
+                self.release(name)
+            else:
+                waiter.cancel()
+                request_class.waiters.remove(waiter)
+            request_class.timed_out += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server overloaded, please retry",
+                headers={"Retry-After": str(max(1, int(request_class.deadline)))}
+            )
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(name)
+            else:
+                waiter.cancel()
+                if waiter in request_class.waiters:
+                    request_class.waiters.remove(waiter)
+            raise
+        finally:
+            request_class.total_wait += loop.time() - started
+
+    def release(self, name: str) -> None:
+        request_class = self.classes[name]
+        request_class.active -= 1
+        self.total_active -= 1
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "total_limit": self.total_limit,
+            "total_active": self.total_active,
+            "classes": {c.name: c.stats() for c in self._order},
+        }
+
+
+def admit(controller: AdmissionController, name: str):
+    """Route dependency holding a slot of ``name`` for the request's lifetime."""
+    async def dependency():
+        await controller.acquire(name)
+        try:
+            yield
+        finally:
+            controller.release(name)
+    return Depends(dependency)
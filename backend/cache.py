@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+
+def audio_fingerprint(content: bytes) -> str:
+    """Fast content hash of an uploaded audio blob, used as a cache key."""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    ``get_or_load`` deduplicates concurrent loads of the same key, so
+    identical in-flight requests share a single call to the loader. An
+    optional shared ``backend`` (see ``store.SQLiteSharedStore``) is consulted
+    on local misses so entries loaded by one worker are reused by the others.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, backend=None, namespace: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.namespace = namespace
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_hits = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.backend is not None:
+            # The shared store does blocking SQLite I/O
+            value = await run_in_threadpool(self.backend.get, f"{self.namespace}:{key}")
+            if value is not None:
+                self.set(key, value)
+                self.hits += 1
+                self.shared_hits += 1
+                return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(RuntimeError("Load was cancelled"))
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody was waiting
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            # Release waiters before the shared write, which may be cancelled
+            future.set_result(value)
+            if self.backend is not None:
+                await run_in_threadpool(self.backend.set, f"{self.namespace}:{key}", value, self.ttl)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        served = self.hits + self.coalesced
+        total = served + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "hit_rate": served / total if total else 0.0,
+        }
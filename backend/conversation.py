@@ -0,0 +1,145 @@
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Slots each multi-turn intent needs before it can be confirmed
+REQUIRED_SLOTS = {
+    "transfer_money": ("recipient", "amount"),
+    "pay_bill": ("bill_type", "amount"),
+}
+
+_AMOUNT = re.compile(r"(\d+(?:\.\d+)?)")
+# Words that are part of the command rather than a name
+_NOT_NAMES = {"send", "transfer", "pay", "money", "rupees", "rs", "bill", "my", "the", "account"}
+# Filler around a bare answer ("Ramesh please", "500 rupees")
+_FILLER = {"rupees", "rs", "please", "yes", "no", "ok", "okay", "haan", "it", "is", "its", "to"}
+
+
+class ConversationState:
+    """Pending intent and collected entities for one user's voice flow.
+
+    Slotted, with interned strings and ``None`` instead of an empty dict,
+    so a million idle sessions stay small.
+    """
+
+    __slots__ = ("intent", "entities", "language", "expires_at")
+
+    def __init__(self, intent: str, entities: Optional[dict], language: str, expires_at: float):
+        self.intent = sys.intern(intent)
+        self.entities = entities or None
+        self.language = sys.intern(language)
+        self.expires_at = expires_at
+
+    def missing(self) -> list:
+        entities = self.entities or {}
+        return [slot for slot in REQUIRED_SLOTS.get(self.intent, ()) if slot not in entities]
+
+    def merge(self, entities: dict) -> None:
+        if entities:
+            self.entities = {**(self.entities or {}), **entities}
+
+    def dump(self) -> list:
+        return [self.intent, self.entities, self.language, self.expires_at]
+
+    @classmethod
+    def load(cls, data: list) -> "ConversationState":
+        return cls(*data)
+
+
+class ConversationStore:
+    """Conversation states keyed by user_id, with TTL and a size cap.
+
+    States are kept in last-write order; expired ones are dropped on read
+    and swept from the oldest end on write, and the least recently written
+    state is evicted once ``max_sessions`` is reached. With a shared
+    ``backend`` (see ``store.SQLiteSharedStore``) states live there instead
+    so every worker sees the same conversation.
+    """
+
+    def __init__(self, max_sessions: int = 100000, ttl: float = 300.0, backend=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.backend = backend
+        self._states: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, user_id: str) -> Optional[ConversationState]:
+        if self.backend is not None:
+            data = self.backend.get(f"conversation:{user_id}")
+            return ConversationState.load(data) if data else None
+
+        state = self._states.get(user_id)
+        if state is not None and state.expires_at < time.time():
+            del self._states[user_id]
+            self.expired += 1
+            return None
+        return state
+
+    def set(self, user_id: str, state: ConversationState) -> None:
+        state.expires_at = time.time() + self.ttl
+        if self.backend is not None:
+            self.backend.set(f"conversation:{user_id}", state.dump(), self.ttl)
+            return
+
+        self._states[user_id] = state
+        self._states.move_to_end(user_id)
+        self._sweep()
+
+    def clear(self, user_id: str) -> None:
+        if self.backend is not None:
+            self.backend.delete(f"conversation:{user_id}")
+        else:
+            self._states.pop(user_id, None)
+
+    def _sweep(self) -> None:
+        now = time.time()
+        # Every write refreshes the TTL, so the oldest entries expire first
+        while self._states:
+            user_id, state = next(iter(self._states.items()))
+            if state.expires_at >= now:
+                break
+            self._states.popitem(last=False)
+            self.expired += 1
+        while len(self._states) > self.max_sessions:
+            self._states.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._states),
+            "max_sessions": self.max_sessions,
+            "ttl": self.ttl,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "shared": self.backend is not None,
+        }
+
+
+def extract_entities(text: str, categories, expecting=()) -> dict:
+    """Pull amount, recipient and bill type out of one utterance.
+
+    ``expecting`` lists the slots the user was just asked for, so a bare
+    answer such as "Ramesh" fills the recipient.
+    """
+    text = text.lower().strip().rstrip(".!?")
+    entities = {}
+    amount = _AMOUNT.search(text.replace(",", ""))
+    if amount:
+        entities["amount"] = float(amount.group(1))
+    if " to " in f" {text}":
+        tail = re.sub(r"[\d.,]+", " ", f" {text}".rsplit(" to ", 1)[1])
+        words = tail.split()
+        if words and not _NOT_NAMES.intersection(words):
+            entities["recipient"] = " ".join(words)
+    for category in categories:
+        if category in text:
+            entities["bill_type"] = category
+            break
+    if "recipient" in expecting and "recipient" not in entities and "bill_type" not in entities:
+        words = [w for w in re.sub(r"[\d.,]+", " ", text.replace("'", "")).split() if w not in _FILLER]
+        if words and not _NOT_NAMES.intersection(words):
+            entities["recipient"] = " ".join(words)
+    return entities
@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine, Column, String, Float, Integer, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import create_engine, event, Column, String, Float, Integer, DateTime, Boolean, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime, timezone
 import os
+import zlib
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,10 +11,40 @@ load_dotenv()
 # Use SQLite for simplicity (file-based SQL database)
 DATABASE_URL = "sqlite:///./voice_banking.db"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def make_engine(url):
+    sqlite_engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 15})
+    
+    @event.listens_for(sqlite_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers in other worker processes proceed during writes
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    
+    return sqlite_engine
+
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Optional sharded ledger: accounts, transactions, spending rollups and
+# transfer counterparties are
+# hash-partitioned by user_id across LEDGER_SHARDS SQLite files, while users
+# and auth logs stay in the main database. With a single shard the ledger lives in the main database.
+LEDGER_SHARDS = max(1, int(os.getenv("LEDGER_SHARDS", "1")))
+if LEDGER_SHARDS == 1:
+    ledger_engines = [engine]
+else:
+    ledger_engines = [
+        make_engine(f"sqlite:///./voice_banking_ledger_{shard}.db")
+        for shard in range(LEDGER_SHARDS)
+    ]
+LedgerSessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+    for shard_engine in ledger_engines
+]
+
 class User(Base):
     __tablename__ = "users"
     
@@ -53,6 +84,18 @@ class Transaction(Base):
     
     account = relationship("Account", back_populates="transactions")
 
+class SpendingRollup(Base):
+    __tablename__ = "spending_rollups"
+    
+    # Running totals per account, kept next to the account's transactions
+    account_id = Column(String, ForeignKey("accounts.account_id"), primary_key=True)
+    type = Column(String, primary_key=True)  # debit/credit
+    period = Column(String, primary_key=True)  # day/month/year
+    period_key = Column(String, primary_key=True)  # 2026-10-19 / 2026-10 / 2026
+    category = Column(String, primary_key=True)  # lowercased recipient or bill type, "*" for all
+    total = Column(Float, default=0.0)
+    count = Column(Integer, default=0)
+
 class AuthLog(Base):
     __tablename__ = "auth_logs"
     
@@ -64,6 +107,89 @@ class AuthLog(Base):
     
     user = relationship("User", back_populates="auth_logs")
 
+class TransferIntent(Base):
+    __tablename__ = "transfer_intents"
+    
+    # Coordinator record for transfers between ledger shards
+    transfer_id = Column(String, primary_key=True, index=True)
+    sender_user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
+    recipient_user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    description = Column(String)
+    status = Column(String, default="pending", index=True)  # pending/recovering/completed/aborted
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    claimed_at = Column(DateTime)
+
+class Counterparty(Base):
+    __tablename__ = "counterparties"
+    
+    # People a user has sent money to, for resolving recipients by name;
+    # kept on the owner's ledger shard and written with the debit
+    owner_user_id = Column(String, ForeignKey("users.user_id"), primary_key=True)
+    recipient_user_id = Column(String, ForeignKey("users.user_id"), primary_key=True)
+    transfer_count = Column(Integer, default=0)
+    last_transfer_at = Column(DateTime)
+
+class StandingInstruction(Base):
+    __tablename__ = "standing_instructions"
+    
+    instruction_id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.user_id"), nullable=False, index=True)
+    type = Column(String, nullable=False)  # transfer/bill_pay
+    recipient_user_id = Column(String, ForeignKey("users.user_id"))
+    bill_type = Column(String)
+    amount = Column(Float, nullable=False)
+    description = Column(String)
+    frequency = Column(String, nullable=False)  # daily/weekly/monthly
+    start_at = Column(DateTime)  # first run; monthly runs keep its day of month
+    next_run_at = Column(DateTime, nullable=False)
+    active = Column(Boolean, default=True)
+    last_run_at = Column(DateTime)
+    last_status = Column(String)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (Index("ix_standing_instructions_due", "active", "next_run_at"),)
+
+class Ledger:
+    """Per-request access to the ledger shards.
+
+    ``session(user_id)`` returns the session holding that user's account and
+    transactions, opening at most one session per shard. When unsharded it is
+    the main request session, so ledger and user writes share one commit.
+    """
+    
+    def __init__(self, db):
+        self.db = db
+        self._sessions = {}
+    
+    @property
+    def sharded(self):
+        return LEDGER_SHARDS > 1
+    
+    def session(self, user_id):
+        return self.shard_session(shard_for(user_id))
+    
+    def shard_session(self, shard):
+        if not self.sharded:
+            return self.db
+        if shard not in self._sessions:
+            self._sessions[shard] = LedgerSessions[shard]()
+        return self._sessions[shard]
+    
+    def commit(self):
+        # The main session is committed by the caller
+        for session in self._sessions.values():
+            session.commit()
+    
+    def close(self):
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+def shard_for(user_id):
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(user_id.encode()) % LEDGER_SHARDS
+
 def get_db():
     db = SessionLocal()
     try:
@@ -72,4 +198,14 @@ def get_db():
         db.close()
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    if LEDGER_SHARDS > 1:
+        ledger_tables = [Account.__table__, Transaction.__table__, SpendingRollup.__table__, Counterparty.__table__]
+        for shard_engine in ledger_engines:
+            Base.metadata.create_all(bind=shard_engine, tables=ledger_tables)
+
+def dispose_engines():
+    # Called before forking workers so no pooled connection is shared
+    engine.dispose()
+    for shard_engine in ledger_engines:
+        shard_engine.dispose()
\ No newline at end of file
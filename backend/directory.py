@@ -0,0 +1,348 @@
+import re
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Set
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from database import init_db, SessionLocal, Ledger, Account, Counterparty, Transaction, User
+
+# Devanagari to Latin, close to how names are spelled in English
+_DEVANAGARI_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ee", "उ": "u", "ऊ": "oo", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au",
+}
+_DEVANAGARI_SIGNS = {
+    "ा": "aa", "ि": "i", "ी": "ee", "ु": "u", "ू": "oo", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ं": "n", "ँ": "n", "ः": "h",
+}
+_DEVANAGARI_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v", "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_VIRAMA = "्"
+# Nukta forms (ज़, फ़, ...) are read as their base consonant
+_NUKTA = "़"
+
+# Spelling variants that sound alike in Indian names, applied in order
+_PHONETIC_RULES = [
+    ("ph", "f"), ("bh", "b"), ("dh", "d"), ("th", "t"), ("kh", "k"), ("gh", "g"),
+    ("jh", "j"), ("chh", "c"), ("ch", "c"), ("sh", "s"), ("ck", "k"), ("q", "k"),
+    ("z", "j"), ("w", "v"), ("x", "ks"), ("ee", "i"), ("oo", "u"), ("y", "i"),
+]
+
+_SOUNDEX_CODES = {}
+for _letters, _code in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _code
+
+
+def transliterate(text: str) -> str:
+    """Romanize Devanagari text; other characters pass through unchanged."""
+    out = []
+    chars = text.replace(_NUKTA, "")
+    for i, char in enumerate(chars):
+        if char in _DEVANAGARI_CONSONANTS:
+            out.append(_DEVANAGARI_CONSONANTS[char])
+            following = chars[i + 1] if i + 1 < len(chars) else ""
+            # Inherent vowel, dropped before a sign/virama and at word end
+            if following and following not in _DEVANAGARI_SIGNS and following != _VIRAMA and not following.isspace():
+                out.append("a")
+        elif char in _DEVANAGARI_VOWELS:
+            out.append(_DEVANAGARI_VOWELS[char])
+        elif char in _DEVANAGARI_SIGNS:
+            out.append(_DEVANAGARI_SIGNS[char])
+        elif char != _VIRAMA:
+            out.append(char)
+    return "".join(out)
+
+
+def normalize(text: str) -> str:
+    text = re.sub(r"[^a-z0-9 ]+", " ", transliterate(text).lower())
+    # Long vowels are spelled both ways ("kumaar"/"kumar", "lakshmee"/"lakshmi")
+    text = text.replace("ee", "i").replace("oo", "u")
+    return re.sub(r"([aeiou])\1+", r"\1", " ".join(text.split()))
+
+
+def soundex(word: str) -> str:
+    if not word:
+        return ""
+    code = word[0].upper()
+    last = _SOUNDEX_CODES.get(word[0], "")
+    for char in word[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in "hw":
+            last = digit
+    return code.ljust(4, "0")
+
+
+def phonetic_key(word: str) -> str:
+    """Metaphone-style key that folds common Indian-name spelling variants."""
+    for pattern, replacement in _PHONETIC_RULES:
+        word = word.replace(pattern, replacement)
+    if not word:
+        return ""
+    # Keep the first letter, drop later vowels and h, and squeeze repeats
+    key = word[0]
+    for char in word[1:]:
+        if char in "aeiouh" or char == key[-1]:
+            continue
+        key += char
+    return key
+
+
+def word_keys(word: str) -> Set[str]:
+    return {"s:" + soundex(word), "p:" + phonetic_key(word)}
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DirectoryEntry:
+    __slots__ = ("user_id", "name", "phone", "normalized", "trigrams", "keys", "transfer_count", "last_transfer_at")
+
+    def __init__(self, user_id: str, name: str, phone: str, transfer_count: int = 0, last_transfer_at=None):
+        self.user_id = user_id
+        self.name = name
+        self.phone = phone
+        self.normalized = normalize(name)
+        self.trigrams = trigrams(self.normalized)
+        self.keys = set()
+        for word in self.normalized.split():
+            self.keys |= word_keys(word)
+        self.transfer_count = transfer_count
+        self.last_transfer_at = last_transfer_at
+
+
+class UserDirectory:
+    """One user's past counterparties, indexed by phonetic key and trigram."""
+
+    def __init__(self):
+        self.entries: Dict[str, DirectoryEntry] = {}
+        self.by_key: Dict[str, Set[str]] = defaultdict(set)
+        self.by_trigram: Dict[str, Set[str]] = defaultdict(set)
+        self.loaded_at = time.monotonic()
+
+    def add(self, entry: DirectoryEntry) -> None:
+        existing = self.entries.get(entry.user_id)
+        if existing is not None:
+            existing.transfer_count = entry.transfer_count
+            existing.last_transfer_at = entry.last_transfer_at
+            return
+        self.entries[entry.user_id] = entry
+        for key in entry.keys:
+            self.by_key[key].add(entry.user_id)
+        for gram in entry.trigrams:
+            self.by_trigram[gram].add(entry.user_id)
+
+    def search(self, query: str, limit: int = 5) -> List[dict]:
+        digits = re.sub(r"\D", "", query)
+        if len(digits) >= 4:
+            matches = [e for e in self.entries.values() if digits in re.sub(r"\D", "", e.phone)]
+            return [self._result(e, 1.0) for e in sorted(matches, key=lambda e: -e.transfer_count)[:limit]]
+
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        query_grams = trigrams(normalized)
+        query_words = normalized.split()
+
+        scores: Dict[str, float] = defaultdict(float)
+        gram_hits: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for user_id in self.by_trigram.get(gram, ()):
+                gram_hits[user_id] += 1
+        for user_id, hits in gram_hits.items():
+            scores[user_id] += hits / len(query_grams)
+
+        for word in query_words:
+            for key in word_keys(word):
+                for user_id in self.by_key.get(key, ()):
+                    # Phonetic matches count per query word
+                    scores[user_id] += 0.5 / len(query_words)
+
+        ranked = []
+        for user_id, score in scores.items():
+            entry = self.entries[user_id]
+            # Slight preference for people the user pays often
+            score += min(entry.transfer_count, 20) * 0.005
+            ranked.append((score, entry))
+        ranked.sort(key=lambda item: -item[0])
+        return [self._result(entry, round(score, 3)) for score, entry in ranked[:limit] if score >= 0.3]
+
+    @staticmethod
+    def _result(entry: DirectoryEntry, score: float) -> dict:
+        return {
+            "user_id": entry.user_id,
+            "name": entry.name,
+            "phone": entry.phone,
+            "score": score,
+            "transfer_count": entry.transfer_count,
+        }
+
+
+class RecipientDirectory:
+    """Per-user recipient indexes, loaded lazily from ``Counterparty`` rows.
+
+    Indexes are kept for the ``max_users`` most recently used owners and
+    reloaded after ``ttl`` seconds so transfers made by other workers show up.
+    """
+
+    def __init__(self, max_users: int = 10000, ttl: float = 300.0):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users: "OrderedDict[str, UserDirectory]" = OrderedDict()
+
+    def _get(self, ledger: Ledger, owner_user_id: str) -> UserDirectory:
+        directory = self._users.get(owner_user_id)
+        if directory is not None and time.monotonic() - directory.loaded_at < self.ttl:
+            self._users.move_to_end(owner_user_id)
+            return directory
+
+        directory = UserDirectory()
+        # Counterparties live on the owner's ledger shard, users in the main database
+        counterparties = ledger.session(owner_user_id).query(Counterparty).filter(
+            Counterparty.owner_user_id == owner_user_id
+        ).all()
+        if counterparties:
+            users = {u.user_id: u for u in ledger.db.query(User).filter(
+                User.user_id.in_([c.recipient_user_id for c in counterparties])
+            )}
+            for counterparty in counterparties:
+                user = users.get(counterparty.recipient_user_id)
+                if user is not None:
+                    directory.add(DirectoryEntry(
+                        user.user_id, user.name, user.phone,
+                        counterparty.transfer_count, counterparty.last_transfer_at
+                    ))
+        self._users[owner_user_id] = directory
+        self._users.move_to_end(owner_user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return directory
+
+    def search(self, ledger: Ledger, owner_user_id: str, query: str, limit: int = 5) -> List[dict]:
+        return self._get(ledger, owner_user_id).search(query, limit)
+
+    def resolve(self, ledger: Ledger, owner_user_id: str, name: str) -> User:
+        """The past recipient ``name`` refers to.
+
+        Raises 404 when nobody matches and 409, with the candidates, when
+        the best match isn't clearly ahead.
+        """
+        candidates = self.search(ledger, owner_user_id, name, limit=3)
+        if candidates and not is_confident(candidates):
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Multiple recipients match", "candidates": candidates}
+            )
+        recipient = ledger.db.get(User, candidates[0]["user_id"]) if candidates else None
+        if recipient is None:
+            raise HTTPException(status_code=404, detail="Recipient not found")
+        return recipient
+
+    def record_transfer(self, owner_user_id: str, recipient: User) -> None:
+        """Count a committed transfer in the owner's index, if it is loaded.
+
+        The ``Counterparty`` row itself is written by ``record_counterparty``
+        in the same commit as the debit.
+        """
+        directory = self._users.get(owner_user_id)
+        if directory is not None:
+            entry = directory.entries.get(recipient.user_id)
+            directory.add(DirectoryEntry(
+                recipient.user_id, recipient.name, recipient.phone,
+                entry.transfer_count + 1 if entry is not None else 1, datetime.now(timezone.utc)
+            ))
+
+
+def record_counterparty(session, owner_user_id: str, recipient_user_id: str, when: datetime) -> None:
+    """Count a transfer on the owner's ledger shard; the caller commits.
+
+    Upserted in SQL, like the spending rollups, so concurrent transfers
+    from several workers all count.
+    """
+    stmt = insert(Counterparty).values(
+        owner_user_id=owner_user_id,
+        recipient_user_id=recipient_user_id,
+        transfer_count=1,
+        last_transfer_at=when
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[Counterparty.owner_user_id, Counterparty.recipient_user_id],
+        set_={
+            "transfer_count": Counterparty.transfer_count + 1,
+            "last_transfer_at": stmt.excluded.last_transfer_at,
+        }
+    ))
+
+
+def is_confident(candidates: List[dict]) -> bool:
+    """Whether the top candidate is a strong match clearly ahead of the runner-up."""
+    if not candidates or candidates[0]["score"] < 1.0:
+        return False
+    return len(candidates) == 1 or candidates[0]["score"] - candidates[1]["score"] >= 0.15
+
+
+def backfill_counterparties(ledger: Ledger) -> int:
+    """Seed ``Counterparty`` rows from existing debit transactions.
+
+    Debits only record the recipient's name, so names shared by several
+    users are skipped rather than guessed.
+    """
+    db = ledger.db
+    by_name = {}
+    for user in db.query(User).all():
+        by_name[user.name] = None if user.name in by_name else user
+
+    seeded = 0
+    for owner in db.query(User).all():
+        session = ledger.session(owner.user_id)
+        account = session.query(Account).filter(Account.user_id == owner.user_id).first()
+        if not account:
+            continue
+        rows = session.query(
+            Transaction.recipient, func.count(), func.max(Transaction.timestamp)
+        ).filter(
+            Transaction.account_id == account.account_id,
+            Transaction.type == "debit"
+        ).group_by(Transaction.recipient).all()
+        for name, count, last_transfer_at in rows:
+            recipient = by_name.get(name)
+            if recipient is None or recipient.user_id == owner.user_id:
+                continue
+            counterparty = session.get(Counterparty, (owner.user_id, recipient.user_id))
+            if counterparty is None:
+                session.add(Counterparty(
+                    owner_user_id=owner.user_id,
+                    recipient_user_id=recipient.user_id,
+                    transfer_count=count,
+                    last_transfer_at=last_transfer_at
+                ))
+                seeded += 1
+        session.commit()
+    return seeded
+
+
+if __name__ == "__main__":
+    init_db()
+    db = SessionLocal()
+    ledger = Ledger(db)
+    try:
+        print(f"Seeded {backfill_counterparties(ledger)} counterparties")
+    finally:
+        ledger.close()
+        db.close()
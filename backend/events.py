@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Set
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "ledger_events"
+
+# Only an installed bus drains the events queued on sessions
+_installed = False
+
+
+def record_event(session, account, transaction) -> None:
+    """Queue a balance/transaction event to publish once ``session`` commits."""
+    if not _installed:
+        return
+    session.info.setdefault(PENDING_KEY, []).append({
+        "type": "transaction",
+        "user_id": account.user_id,
+        "balance": account.balance,
+        "transaction": {
+            "transaction_id": transaction.transaction_id,
+            "type": transaction.type,
+            "amount": transaction.amount,
+            "recipient": transaction.recipient,
+            "description": transaction.description,
+            "timestamp": _timestamp(transaction),
+            "status": transaction.status,
+        },
+    })
+
+
+def _timestamp(transaction) -> str:
+    # Match the naive UTC timestamps the REST endpoints return
+    timestamp = transaction.timestamp or datetime.now(timezone.utc)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.isoformat()
+
+
+class EventBus:
+    """Fans out ledger events to the sessions subscribed for each user.
+
+    Subscribers get a bounded queue; a slow subscriber loses its oldest
+    events rather than holding memory. With a shared ``backend`` (see
+    ``store.SQLiteSharedStore``) events go through the store and every
+    worker relays them to its own subscribers, including events written by
+    other processes such as the scheduler.
+    """
+
+    def __init__(self, backend=None, queue_size: int = 100, poll_interval: float = 0.5):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop = None
+        self._relay = None
+        self.published = 0
+        self.dropped = 0
+
+    def install(self) -> None:
+        """Publish events recorded on any SQLAlchemy session after it commits."""
+        global _installed
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+        _installed = True
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.backend is not None:
+            self._relay = asyncio.create_task(self._relay_from_backend())
+
+    async def stop(self) -> None:
+        if self._relay is not None:
+            self._relay.cancel()
+
+    def _after_commit(self, session) -> None:
+        # The data is already saved; a failed publish must not fail the commit
+        for pending in session.info.pop(PENDING_KEY, ()):
+            try:
+                self.publish(pending["user_id"], pending)
+            except Exception:
+                logger.exception("Failed to publish event for user %s", pending["user_id"])
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(PENDING_KEY, None)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: str, payload: dict) -> None:
+        self.published += 1
+        if self.backend is not None:
+            self.backend.append_event(user_id, payload)
+        elif self._loop is None:
+            return
+        elif _running_loop() is self._loop:
+            self._dispatch(user_id, payload)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, user_id, payload)
+
+    def _dispatch(self, user_id: str, payload: dict) -> None:
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(payload)
+
+    async def _relay_from_backend(self) -> None:
+        cursor = await run_in_threadpool(self.backend.last_event_id)
+        while True:
+            try:
+                for event_id, user_id, payload in await run_in_threadpool(self.backend.events_after, cursor):
+                    cursor = event_id
+                    self._dispatch(user_id, payload)
+            except Exception:
+                logger.exception("Event relay failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "users": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def format_sse(payload: dict) -> bytes:
+    return b"event: " + payload["type"].encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+
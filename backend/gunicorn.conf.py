@@ -0,0 +1,31 @@
+# Multi-worker deployment:
+#
+#   cd backend
+#   SHARED_STORE_PATH=./shared_store.db LEDGER_SHARDS=4 gunicorn server:app
+#
+# SHARED_STORE_PATH puts the transcript cache and rate-limit counters in a
+# SQLite file shared by all workers. LEDGER_SHARDS (default 1) splits accounts
+# and transactions across that many SQLite files by user_id. Keep the shard
+# count fixed once data exists: users are not rebalanced between shards.
+# Admission control limits apply per worker.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8001")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # Create tables once in the master so workers don't race on schema setup
+    import database
+    database.init_db()
+    database.dispose_engines()
+    if workers > 1 and not os.getenv("SHARED_STORE_PATH"):
+        server.log.warning(
+            "%d workers without SHARED_STORE_PATH: caches, rate limits and "
+            "pushed events are per worker, so clients may miss updates", workers
+        )
@@ -0,0 +1,133 @@
+"""Per-account spending rollups by day, month and year.
+
+Rollups are updated in the same commit as every ledger write. To rebuild
+them from the transaction history (e.g. after first deploying this):
+
+    python insights.py
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from database import init_db, SessionLocal, Ledger, Transaction, SpendingRollup, LEDGER_SHARDS
+
+ALL = "*"
+PERIOD_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+
+
+def period_keys(when: datetime) -> dict:
+    return {period: when.strftime(fmt) for period, fmt in PERIOD_FORMATS.items()}
+
+
+def category_for(recipient) -> str:
+    return (recipient or "other").strip().lower()
+
+
+def record_rollup(session, transaction) -> None:
+    """Add ``transaction`` to its account's rollups; the caller commits.
+
+    Rollups are upserted in SQL rather than read and updated through the
+    ORM, so several writes to a new bucket in one session, or from several
+    workers, all add up.
+    """
+    when = transaction.timestamp or datetime.now(timezone.utc)
+    category = category_for(transaction.recipient)
+    rows = [
+        {
+            "account_id": transaction.account_id,
+            "type": transaction.type,
+            "period": period,
+            "period_key": period_key,
+            "category": bucket,
+            "total": transaction.amount,
+            "count": 1,
+        }
+        for period, period_key in period_keys(when).items()
+        for bucket in (category, ALL)
+    ]
+    stmt = insert(SpendingRollup)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[
+            SpendingRollup.account_id, SpendingRollup.type, SpendingRollup.period,
+            SpendingRollup.period_key, SpendingRollup.category
+        ],
+        set_={
+            "total": SpendingRollup.total + stmt.excluded.total,
+            "count": SpendingRollup.count + stmt.excluded.count,
+        }
+    ), rows)
+
+
+def lookup(session, account_id: str, type: str, period: str, period_key: str, category: str = ALL) -> dict:
+    rollup = session.get(SpendingRollup, (account_id, type, period, period_key, category))
+    return {
+        "total": rollup.total if rollup else 0.0,
+        "count": rollup.count if rollup else 0,
+    }
+
+
+def top_categories(session, account_id: str, type: str, period: str, period_key: str, limit: int = 5) -> list:
+    rows = session.query(SpendingRollup).filter(
+        SpendingRollup.account_id == account_id,
+        SpendingRollup.type == type,
+        SpendingRollup.period == period,
+        SpendingRollup.period_key == period_key,
+        SpendingRollup.category != ALL
+    ).order_by(SpendingRollup.total.desc()).limit(limit).all()
+    return [{"category": r.category, "total": r.total, "count": r.count} for r in rows]
+
+
+def rebuild_rollups(session) -> int:
+    """Recompute every rollup on one ledger session from its transactions."""
+    session.query(SpendingRollup).delete()
+    daily = session.query(
+        Transaction.account_id,
+        Transaction.type,
+        Transaction.recipient,
+        func.strftime("%Y-%m-%d", Transaction.timestamp),
+        func.sum(Transaction.amount),
+        func.count()
+    ).group_by(
+        Transaction.account_id,
+        Transaction.type,
+        Transaction.recipient,
+        func.strftime("%Y-%m-%d", Transaction.timestamp)
+    ).yield_per(10000)
+
+    totals = defaultdict(lambda: [0.0, 0])
+    for account_id, type, recipient, day, total, count in daily:
+        category = category_for(recipient)
+        for period, period_key in (("day", day), ("month", day[:7]), ("year", day[:4])):
+            for bucket in (category, ALL):
+                entry = totals[(account_id, type, period, period_key, bucket)]
+                entry[0] += total
+                entry[1] += count
+
+    session.bulk_insert_mappings(SpendingRollup, [
+        {
+            "account_id": account_id,
+            "type": type,
+            "period": period,
+            "period_key": period_key,
+            "category": category,
+            "total": total,
+            "count": count,
+        }
+        for (account_id, type, period, period_key, category), (total, count) in totals.items()
+    ])
+    session.commit()
+    return len(totals)
+
+
+if __name__ == "__main__":
+    init_db()
+    db = SessionLocal()
+    ledger = Ledger(db)
+    try:
+        for shard in range(LEDGER_SHARDS):
+            print(f"Shard {shard}: {rebuild_rollups(ledger.shard_session(shard))} rollups")
+    finally:
+        ledger.close()
+        db.close()
@@ -0,0 +1,347 @@
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from database import Account, Transaction, TransferIntent, User, Ledger
+from directory import record_counterparty
+from events import record_event
+from insights import record_rollup
+
+logger = logging.getLogger(__name__)
+
+
+def credit_id_for(transfer_id: str) -> str:
+    # Deterministic so a retried credit can't be applied twice
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"credit:{transfer_id}"))
+
+
+def debit_account(session, account: Account, amount: float) -> None:
+    """Take ``amount`` from ``account`` in one statement, if the balance covers it.
+
+    The check and the write are a single UPDATE so concurrent workers can't
+    both spend the same balance.
+    """
+    row = session.execute(
+        update(Account)
+        .where(Account.account_id == account.account_id, Account.balance >= amount)
+        .values(balance=Account.balance - amount)
+        .returning(Account.balance)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=400, detail="Insufficient balance")
+    # RETURNING hands back the value before column affinity, so 10025.0 comes back as 10025
+    set_committed_value(account, "balance", float(row[0]))
+
+
+def credit_account(session, account: Account, amount: float) -> None:
+    row = session.execute(
+        update(Account)
+        .where(Account.account_id == account.account_id)
+        .values(balance=Account.balance + amount)
+        .returning(Account.balance)
+        .execution_options(synchronize_session=False)
+    ).first()
+    set_committed_value(account, "balance", float(row[0]))
+
+
+def record_write(session, account: Account, transaction: Transaction) -> None:
+    """Update rollups and queue the change event alongside a new transaction."""
+    if transaction.timestamp is None:
+        transaction.timestamp = datetime.now(timezone.utc)
+    record_rollup(session, transaction)
+    record_event(session, account, transaction)
+
+
+def stage_transfer(sender_db, sender_account: Account, sender: User, recipient_db, recipient_account: Account,
+                   recipient: User, amount: float, description=None, transaction_id=None) -> Transaction:
+    """Apply a same-shard transfer to the session without committing."""
+    debit_account(sender_db, sender_account, amount)
+    credit_account(recipient_db, recipient_account, amount)
+
+    transaction = Transaction(
+        transaction_id=transaction_id or str(uuid.uuid4()),
+        account_id=sender_account.account_id,
+        type="debit",
+        amount=amount,
+        recipient=recipient.name,
+        description=description or f"Transfer to {recipient.name}",
+        status="completed"
+    )
+    sender_db.add(transaction)
+    record_write(sender_db, sender_account, transaction)
+    record_counterparty(sender_db, sender.user_id, recipient.user_id, transaction.timestamp)
+
+    credit = Transaction(
+        transaction_id=credit_id_for(transaction.transaction_id) if transaction_id else str(uuid.uuid4()),
+        account_id=recipient_account.account_id,
+        type="credit",
+        amount=amount,
+        recipient=sender.name,
+        description=description or "Received from sender",
+        status="completed"
+    )
+    recipient_db.add(credit)
+    record_write(recipient_db, recipient_account, credit)
+    return transaction
+
+
+def stage_bill_payment(db, account: Account, bill_type: str, amount: float, description=None,
+                       transaction_id=None) -> Transaction:
+    """Apply a bill payment to the session without committing."""
+    debit_account(db, account, amount)
+
+    transaction = Transaction(
+        transaction_id=transaction_id or str(uuid.uuid4()),
+        account_id=account.account_id,
+        type="debit",
+        amount=amount,
+        recipient=bill_type,
+        description=description or f"{bill_type} bill payment",
+        status="completed"
+    )
+    db.add(transaction)
+    record_write(db, account, transaction)
+    return transaction
+
+
+def transfer(ledger: Ledger, sender: User, recipient: User, amount: float, description=None) -> Transaction:
+    """Move ``amount`` from sender to recipient and return the sender's debit.
+
+    Same-shard transfers are applied in one commit. Transfers between
+    shards go through ``cross_shard_transfer``.
+    """
+    sender_db = ledger.session(sender.user_id)
+    recipient_db = ledger.session(recipient.user_id)
+    if sender_db is not recipient_db:
+        return cross_shard_transfer(ledger, sender, recipient, amount, description)
+
+    sender_account = sender_db.query(Account).filter(Account.user_id == sender.user_id).first()
+    if not sender_account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    recipient_account = recipient_db.query(Account).filter(Account.user_id == recipient.user_id).first()
+    if not recipient_account:
+        raise HTTPException(status_code=404, detail="Recipient account not found")
+
+    transaction = stage_transfer(
+        sender_db, sender_account, sender, recipient_db, recipient_account, recipient, amount, description
+    )
+    sender_db.commit()
+    return transaction
+
+
+def cross_shard_transfer(ledger: Ledger, sender: User, recipient: User, amount: float, description=None,
+                         transfer_id=None) -> Transaction:
+    """Transfer between two ledger shards.
+
+    1. A pending ``TransferIntent`` is committed in the main database.
+    2. The sender shard debits the account and records a pending debit whose
+       id is the transfer id. Failure here aborts the intent.
+    3. The recipient shard records the credit under a deterministic id.
+    4. The debit and the intent are marked completed.
+
+    Once step 2 commits the transfer only rolls forward: if step 3 or 4
+    fails, ``recover_transfers`` finishes it later, and the returned debit
+    stays ``pending`` until then. The recipient's account is checked
+    before anything is written, so a debit can always be credited.
+    """
+    recipient_db = ledger.session(recipient.user_id)
+    if recipient_db.query(Account.account_id).filter(Account.user_id == recipient.user_id).first() is None:
+        raise HTTPException(status_code=404, detail="Recipient account not found")
+
+    db = ledger.db
+    intent = TransferIntent(
+        transfer_id=transfer_id or str(uuid.uuid4()),
+        sender_user_id=sender.user_id,
+        recipient_user_id=recipient.user_id,
+        amount=amount,
+        description=description,
+        status="pending"
+    )
+    db.add(intent)
+    db.commit()
+
+    sender_db = ledger.session(sender.user_id)
+    try:
+        sender_account = sender_db.query(Account).filter(Account.user_id == sender.user_id).first()
+        if not sender_account:
+            raise HTTPException(status_code=404, detail="Account not found")
+
+        debit_account(sender_db, sender_account, amount)
+        debit = Transaction(
+            transaction_id=intent.transfer_id,
+            account_id=sender_account.account_id,
+            type="debit",
+            amount=amount,
+            recipient=recipient.name,
+            description=description or f"Transfer to {recipient.name}",
+            status="pending"
+        )
+        sender_db.add(debit)
+        record_write(sender_db, sender_account, debit)
+        record_counterparty(sender_db, sender.user_id, recipient.user_id, debit.timestamp)
+        sender_db.commit()
+    except Exception:
+        sender_db.rollback()
+        intent.status = "aborted"
+        db.commit()
+        raise
+
+    try:
+        complete_transfer(ledger, intent, sender.name)
+    except Exception:
+        logger.exception("Transfer %s left pending for recovery", intent.transfer_id)
+        for session in (db, sender_db, recipient_db):
+            session.rollback()
+    return debit
+
+
+def complete_transfer(ledger: Ledger, intent: TransferIntent, sender_name: str) -> None:
+    """Apply the credit side of a debited transfer; safe to call repeatedly."""
+    recipient_db = ledger.session(intent.recipient_user_id)
+    credit_id = credit_id_for(intent.transfer_id)
+    if recipient_db.get(Transaction, credit_id) is None:
+        recipient_account = recipient_db.query(Account).filter(
+            Account.user_id == intent.recipient_user_id
+        ).first()
+        if recipient_account is None:
+            raise LookupError(f"No account for recipient {intent.recipient_user_id}")
+        credit_account(recipient_db, recipient_account, intent.amount)
+        credit = Transaction(
+            transaction_id=credit_id,
+            account_id=recipient_account.account_id,
+            type="credit",
+            amount=intent.amount,
+            recipient=sender_name,
+            description=intent.description or "Received from sender",
+            status="completed"
+        )
+        recipient_db.add(credit)
+        record_write(recipient_db, recipient_account, credit)
+        recipient_db.commit()
+
+    sender_db = ledger.session(intent.sender_user_id)
+    debit = sender_db.get(Transaction, intent.transfer_id)
+    debit.status = "completed"
+    sender_db.commit()
+
+    intent.status = "completed"
+    ledger.db.commit()
+
+
+def claim_transfer(db, transfer_id: str, stale_before: datetime) -> bool:
+    """Atomically claim a pending intent for recovery.
+
+    Claims older than ``stale_before`` are taken over, in case the process
+    holding them died.
+    """
+    claimed = db.query(TransferIntent).filter(
+        TransferIntent.transfer_id == transfer_id,
+        or_(
+            TransferIntent.status == "pending",
+            and_(TransferIntent.status == "recovering", TransferIntent.claimed_at < stale_before)
+        )
+    ).update(
+        {"status": "recovering", "claimed_at": datetime.now(timezone.utc)},
+        synchronize_session=False
+    )
+    db.commit()
+    return claimed == 1
+
+
+def recover_transfers(ledger: Ledger, min_age: float = 60) -> int:
+    """Finish or abort cross-shard transfers left pending by a crash.
+
+    Intents younger than ``min_age`` seconds are skipped, as another worker
+    may still be running them. Each intent is claimed first so concurrent
+    recoveries don't race, and one that fails is released for the next run.
+    """
+    db = ledger.db
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=min_age)
+    recovered = 0
+    candidates = [transfer_id for (transfer_id,) in db.query(TransferIntent.transfer_id).filter(
+        or_(TransferIntent.status == "pending", TransferIntent.status == "recovering"),
+        TransferIntent.created_at < cutoff
+    )]
+    for transfer_id in candidates:
+        if not claim_transfer(db, transfer_id, cutoff):
+            continue
+        intent = db.get(TransferIntent, transfer_id)
+        try:
+            sender_db = ledger.session(intent.sender_user_id)
+            if sender_db.get(Transaction, intent.transfer_id) is None:
+                # Never debited, so there is nothing to roll forward
+                intent.status = "aborted"
+                db.commit()
+                continue
+            sender = db.query(User).filter(User.user_id == intent.sender_user_id).first()
+            complete_transfer(ledger, intent, sender.name)
+            recovered += 1
+        except Exception:
+            logger.exception("Recovering transfer %s failed, will retry", transfer_id)
+            for session in (db, ledger.session(intent.sender_user_id), ledger.session(intent.recipient_user_id)):
+                session.rollback()
+            intent.status = "pending"
+            db.commit()
+    return recovered
+
+
+def apply_batch(ledger: Ledger, sender: User, items, recipients) -> list:
+    """Apply a list of transfers and bill payments for ``sender``.
+
+    ``items`` have ``type``, ``amount``, ``recipient_phone``, ``bill_type``
+    and ``description``; ``recipients`` maps phone numbers to users. Items
+    on the sender's shard are staged and committed together. Each item is
+    validated before it changes any balance, so a failed item is skipped
+    without undoing the others. Transfers to other shards run afterwards
+    through ``cross_shard_transfer``. Returns one result dict per item.
+    """
+    db = ledger.session(sender.user_id)
+    account = db.query(Account).filter(Account.user_id == sender.user_id).first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    local_ids = {u.user_id for u in recipients.values() if ledger.session(u.user_id) is db}
+    accounts = {a.user_id: a for a in db.query(Account).filter(Account.user_id.in_(local_ids))} if local_ids else {}
+    accounts[sender.user_id] = account
+
+    results = [None] * len(items)
+    deferred = []
+    for index, item in enumerate(items):
+        try:
+            if item.type == "bill_pay":
+                if not item.bill_type:
+                    raise HTTPException(status_code=400, detail="bill_type is required")
+                transaction = stage_bill_payment(db, account, item.bill_type, item.amount, item.description)
+            else:
+                recipient = recipients.get(item.recipient_phone)
+                if recipient is None:
+                    raise HTTPException(status_code=404, detail="Recipient not found")
+                if recipient.user_id not in local_ids and recipient.user_id != sender.user_id:
+                    deferred.append((index, item, recipient))
+                    continue
+                recipient_account = accounts.get(recipient.user_id)
+                if recipient_account is None:
+                    raise HTTPException(status_code=404, detail="Recipient account not found")
+                transaction = stage_transfer(
+                    db, account, sender, db, recipient_account, recipient, item.amount, item.description
+                )
+            results[index] = {"index": index, "status": "completed", "transaction_id": transaction.transaction_id}
+        except HTTPException as e:
+            results[index] = {"index": index, "status": "failed", "error": e.detail}
+
+    db.commit()
+
+    for index, item, recipient in deferred:
+        try:
+            transaction = cross_shard_transfer(ledger, sender, recipient, item.amount, item.description)
+            results[index] = {"index": index, "status": transaction.status, "transaction_id": transaction.transaction_id}
+        except HTTPException as e:
+            results[index] = {"index": index, "status": "failed", "error": e.detail}
+
+    return results
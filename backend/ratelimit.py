@@ -0,0 +1,149 @@
+import ipaddress
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+
+class RateLimitStore(ABC):
+    """Backend holding sliding-window counters for the rate limiter."""
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float) -> float:
+        """Record a hit for ``key`` if it is within ``limit`` per ``window``.
+
+        Returns 0 when the hit is allowed, otherwise the number of seconds
+        until it would be. Rejected hits are not recorded.
+        """
+
+
+def sliding_window(window_start: float, previous: int, current: int, now: float,
+                   limit: int, window: float) -> Tuple[float, int, int, float]:
+    """Apply one hit to a sliding-window counter.
+
+    The count over the trailing window is estimated from the current fixed
+    window plus the previous one weighted by how much of it still overlaps.
+    Returns the updated ``(window_start, previous, current)`` and the retry
+    delay (0 if the hit was allowed).
+    """
+    start = now - (now % window)
+    if window_start != start:
+        previous = current if window_start == start - window else 0
+        current = 0
+        window_start = start
+
+    elapsed = now - start
+    weight = 1 - elapsed / window
+    if previous * weight + current + 1 <= limit:
+        return window_start, previous, current + 1, 0.0
+
+    if current + 1 > limit:
+        retry_after = window - elapsed
+    else:
+        # Wait until enough of the previous window has slid out
+        retry_after = window * (1 - (limit - current - 1) / previous) - elapsed
+    return window_start, previous, current, max(retry_after, 0.001)
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Process-local store; counters are pruned once they go stale."""
+
+    def __init__(self, prune_every: int = 10000):
+        self._counters: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._prune_every = prune_every
+        self._hits = 0
+
+    def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.time()
+        with self._lock:
+            self._hits += 1
+            if self._hits % self._prune_every == 0:
+                self._prune(now)
+            entry = self._counters.get(key)
+            if entry is None:
+                entry = [0.0, 0, 0, window]
+                self._counters[key] = entry
+            entry[0], entry[1], entry[2], retry_after = sliding_window(
+                entry[0], entry[1], entry[2], now, limit, window
+            )
+            return retry_after
+
+    def _prune(self, now: float) -> None:
+        stale = [k for k, (start, _, _, window) in self._counters.items() if start < now - 2 * window]
+        for key in stale:
+            del self._counters[key]
+
+
+class RateLimiter:
+    """Named limits (``limit`` hits per ``window`` seconds) checked per key.
+
+    ``trusted_proxies`` is a comma-separated list of networks whose
+    ``X-Forwarded-For`` header is believed when working out the client IP.
+    """
+
+    def __init__(self, store: RateLimitStore, trusted_proxies: str = ""):
+        self.store = store
+        self.rules: Dict[str, Tuple[int, float]] = {}
+        self.rejected: Dict[str, int] = {}
+        self.trusted_proxies = [
+            ipaddress.ip_network(network.strip(), strict=False)
+            for network in trusted_proxies.split(",") if network.strip()
+        ]
+
+    def add_rule(self, name: str, limit: int, window: float) -> None:
+        self.rules[name] = (limit, window)
+        self.rejected[name] = 0
+
+    def check(self, rule: str, key: str) -> None:
+        limit, window = self.rules[rule]
+        retry_after = self.store.hit(f"{rule}:{key}", limit, window)
+        if retry_after:
+            self.rejected[rule] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, request: Request) -> str:
+        host = request.client.host if request.client else "unknown"
+        if not self._trusted(host):
+            return host
+        # Walk back through our own proxies to the address that called them
+        forwarded = request.headers.get("x-forwarded-for", "")
+        for address in reversed([a.strip() for a in forwarded.split(",") if a.strip()]):
+            host = address
+            if not self._trusted(address):
+                break
+        return host
+
+    def by_key(self, rule: str, key_func: Callable[[Request], Awaitable[Optional[str]]]):
+        """Route dependency applying ``rule`` to the key ``key_func`` returns.
+
+        List it before ``admit(...)`` so rejected requests never take an
+        admission slot. Requests with no key are left to the route.
+        """
+        async def dependency(request: Request):
+            key = await key_func(request)
+            if key is not None:
+                # The shared store does blocking SQLite I/O
+                await run_in_threadpool(self.check, rule, key)
+        return Depends(dependency)
+
+    def by_client_ip(self, rule: str):
+        """Route dependency applying ``rule`` to the caller's IP address."""
+        async def client_key(request: Request):
+            return self.client_ip(request)
+        return self.by_key(rule, client_key)
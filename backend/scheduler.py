@@ -0,0 +1,207 @@
+"""Executes due standing instructions in chunked, batched commits.
+
+Run it as one separate process next to the API workers:
+
+    python scheduler.py            # poll every SCHEDULER_INTERVAL seconds
+    python scheduler.py --once     # run whatever is due and exit (cron)
+
+Each pass also finishes cross-shard transfers left pending by a crash.
+"""
+import argparse
+import calendar
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+
+from fastapi import HTTPException
+
+from database import init_db, SessionLocal, Ledger, Account, Transaction, TransferIntent, User, StandingInstruction, shard_for
+from events import EventBus
+from store import SQLiteSharedStore
+import ledger as ledger_ops
+
+logger = logging.getLogger(__name__)
+
+
+def utc_naive(value: datetime) -> datetime:
+    # SQLite hands back naive UTC datetimes; compare like with like
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def advance(run_at: datetime, frequency: str, anchor_day: int = None) -> datetime:
+    """Next run after ``run_at``.
+
+    Monthly runs return to ``anchor_day`` whenever the month is long enough,
+    so the 31st moves to the 28th in February and back to the 31st in March.
+    """
+    if frequency == "daily":
+        return run_at + timedelta(days=1)
+    if frequency == "weekly":
+        return run_at + timedelta(weeks=1)
+    year, month = (run_at.year + 1, 1) if run_at.month == 12 else (run_at.year, run_at.month + 1)
+    day = min(anchor_day or run_at.day, calendar.monthrange(year, month)[1])
+    return run_at.replace(year=year, month=month, day=day)
+
+
+def run_transaction_id(instruction: StandingInstruction) -> str:
+    # One id per scheduled run, so a chunk replayed after a crash is skipped
+    return str(uuid.uuid5(
+        uuid.NAMESPACE_URL,
+        f"instruction:{instruction.instruction_id}:{utc_naive(instruction.next_run_at).isoformat()}"
+    ))
+
+
+def run_chunk(ledger: Ledger, instructions, now: datetime) -> dict:
+    db = ledger.db
+    user_ids = {i.user_id for i in instructions} | {i.recipient_user_id for i in instructions if i.recipient_user_id}
+    users = {u.user_id: u for u in db.query(User).filter(User.user_id.in_(user_ids))}
+
+    by_shard = defaultdict(list)
+    for instruction in instructions:
+        by_shard[shard_for(instruction.user_id)].append(instruction)
+
+    statuses = {}
+    deferred = []
+    for shard, shard_instructions in by_shard.items():
+        session = ledger.shard_session(shard)
+        run_ids = {i.instruction_id: run_transaction_id(i) for i in shard_instructions}
+        done = {tid for (tid,) in session.query(Transaction.transaction_id).filter(
+            Transaction.transaction_id.in_(run_ids.values())
+        )}
+        account_ids = {i.user_id for i in shard_instructions} | {
+            i.recipient_user_id for i in shard_instructions
+            if i.recipient_user_id and shard_for(i.recipient_user_id) == shard
+        }
+        accounts = {a.user_id: a for a in session.query(Account).filter(Account.user_id.in_(account_ids))}
+
+        for instruction in shard_instructions:
+            transaction_id = run_ids[instruction.instruction_id]
+            if transaction_id in done:
+                statuses[instruction.instruction_id] = "completed"
+                continue
+            try:
+                account = accounts.get(instruction.user_id)
+                if account is None:
+                    raise HTTPException(status_code=404, detail="Account not found")
+                if instruction.type == "bill_pay":
+                    ledger_ops.stage_bill_payment(
+                        session, account, instruction.bill_type, instruction.amount,
+                        instruction.description, transaction_id=transaction_id
+                    )
+                else:
+                    recipient = users.get(instruction.recipient_user_id)
+                    if recipient is None:
+                        raise HTTPException(status_code=404, detail="Recipient not found")
+                    if shard_for(recipient.user_id) != shard:
+                        deferred.append((instruction, transaction_id))
+                        continue
+                    recipient_account = accounts.get(recipient.user_id)
+                    if recipient_account is None:
+                        raise HTTPException(status_code=404, detail="Recipient account not found")
+                    ledger_ops.stage_transfer(
+                        session, account, users[instruction.user_id], session, recipient_account, recipient,
+                        instruction.amount, instruction.description, transaction_id=transaction_id
+                    )
+                statuses[instruction.instruction_id] = "completed"
+            except HTTPException as e:
+                statuses[instruction.instruction_id] = f"failed: {e.detail}"
+        session.commit()
+
+    for instruction, transaction_id in deferred:
+        if db.get(TransferIntent, transaction_id) is not None:
+            statuses[instruction.instruction_id] = "completed"
+            continue
+        try:
+            transaction = ledger_ops.cross_shard_transfer(
+                ledger, users[instruction.user_id], users[instruction.recipient_user_id],
+                instruction.amount, instruction.description, transfer_id=transaction_id
+            )
+            statuses[instruction.instruction_id] = transaction.status
+        except HTTPException as e:
+            statuses[instruction.instruction_id] = f"failed: {e.detail}"
+
+    for instruction in instructions:
+        instruction.last_run_at = now
+        instruction.last_status = statuses[instruction.instruction_id]
+        # Missed runs are skipped rather than paid several times over
+        next_run_at = utc_naive(instruction.next_run_at)
+        anchor_day = instruction.start_at.day if instruction.start_at else None
+        while next_run_at <= now:
+            next_run_at = advance(next_run_at, instruction.frequency, anchor_day)
+        instruction.next_run_at = next_run_at
+    db.commit()
+
+    completed = sum(1 for status in statuses.values() if not status.startswith("failed"))
+    return {"completed": completed, "failed": len(statuses) - completed}
+
+
+def run_due_instructions(now: datetime = None, chunk_size: int = 500) -> dict:
+    """Execute every active instruction due at ``now``, ``chunk_size`` at a time."""
+    now = utc_naive(now or datetime.now(timezone.utc))
+    totals = {"completed": 0, "failed": 0}
+    db = SessionLocal()
+    ledger = Ledger(db)
+    try:
+        while True:
+            due = db.query(StandingInstruction).filter(
+                StandingInstruction.active == True,
+                StandingInstruction.next_run_at <= now
+            ).order_by(StandingInstruction.next_run_at).limit(chunk_size).all()
+            if not due:
+                break
+            counts = run_chunk(ledger, due, now)
+            totals["completed"] += counts["completed"]
+            totals["failed"] += counts["failed"]
+    finally:
+        ledger.close()
+        db.close()
+    return totals
+
+
+def recover_pending_transfers() -> int:
+    """Roll forward or abort stuck cross-shard transfers; a no-op unsharded."""
+    db = SessionLocal()
+    ledger = Ledger(db)
+    try:
+        return ledger_ops.recover_transfers(ledger) if ledger.sharded else 0
+    finally:
+        ledger.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Execute due standing instructions")
+    parser.add_argument("--once", action="store_true", help="run due instructions once and exit")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("SCHEDULER_INTERVAL", "60")))
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("SCHEDULER_CHUNK_SIZE", "500")))
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    init_db()
+
+    # Let API workers push the scheduler's ledger writes to subscribed sessions
+    if os.getenv("SHARED_STORE_PATH"):
+        EventBus(backend=SQLiteSharedStore(os.getenv("SHARED_STORE_PATH"))).install()
+
+    while True:
+        started = time.monotonic()
+        recovered = recover_pending_transfers()
+        if recovered:
+            logger.info("Recovered %d pending cross-shard transfers", recovered)
+        totals = run_due_instructions(chunk_size=args.chunk_size)
+        if totals["completed"] or totals["failed"]:
+            logger.info(
+                "Ran standing instructions: %d completed, %d failed in %.1fs",
+                totals["completed"], totals["failed"], time.monotonic() - started
+            )
+        if args.once:
+            break
+        time.sleep(args.interval)
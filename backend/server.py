@@ -1,12 +1,14 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, UploadFile, File
+from fastapi.responses import StreamingResponse, FileResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import List, Literal, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 from sqlalchemy.orm import Session
@@ -16,8 +18,19 @@ from emergentintegrations.llm.openai import OpenAISpeechToText, OpenAITextToSpee
 import aiofiles
 import tempfile
 import io
-
-from database import get_db, init_db, User, Account, Transaction, AuthLog
+import asyncio
+
+from database import get_db, init_db, Ledger, User, Account, Transaction, AuthLog, StandingInstruction
+import ledger as ledger_ops
+import insights
+import scheduler
+from cache import TTLCache, audio_fingerprint
+from admission import AdmissionController, admit
+from ratelimit import RateLimiter, MemoryRateLimitStore
+from store import SQLiteSharedStore
+from events import EventBus, format_sse
+from directory import RecipientDirectory
+from conversation import ConversationState, ConversationStore, REQUIRED_SLOTS, extract_entities
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -30,12 +43,80 @@ EMERGENT_KEY = os.getenv('EMERGENT_LLM_KEY')
 stt = OpenAISpeechToText(api_key=EMERGENT_KEY)
 tts = OpenAITextToSpeech(api_key=EMERGENT_KEY)
 
+# With several workers, caches and rate limits live in a shared local store
+SHARED_STORE_PATH = os.getenv('SHARED_STORE_PATH')
+shared_store = SQLiteSharedStore(SHARED_STORE_PATH) if SHARED_STORE_PATH else None
+
+# Balance and transaction changes are pushed to subscribed sessions once the
+# ledger write commits, so clients don't need to poll
+event_bus = EventBus(backend=shared_store)
+event_bus.install()
+
+# Past transfer counterparties, so spoken names resolve to recipients
+recipient_directory = RecipientDirectory(
+    max_users=int(os.getenv('RECIPIENT_DIRECTORY_USERS', '10000'))
+)
+
+# Multi-turn voice flows keep their pending intent and entities per user
+conversation_store = ConversationStore(
+    max_sessions=int(os.getenv('CONVERSATION_MAX_SESSIONS', '100000')),
+    ttl=float(os.getenv('CONVERSATION_TTL', '300')),
+    backend=shared_store
+)
+
+# Cache transcripts by audio fingerprint so retries and duplicate uploads skip the STT call
+transcript_cache = TTLCache(
+    maxsize=int(os.getenv('TRANSCRIPT_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('TRANSCRIPT_CACHE_TTL', '600')),
+    backend=shared_store,
+    namespace="transcript"
+)
+
 JWT_SECRET = os.getenv('JWT_SECRET')
 JWT_ALGORITHM = 'HS256'
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
+# Admission control: ledger routes are scheduled ahead of auth (bcrypt) and
+# slow voice calls, and excess load is shed instead of queueing forever
+admission = AdmissionController(total_limit=int(os.getenv('ADMISSION_TOTAL_LIMIT', '64')))
+admission.add_class(
+    "ledger",
+    limit=int(os.getenv('LEDGER_CONCURRENCY', '32')),
+    max_queue=int(os.getenv('LEDGER_QUEUE', '256')),
+    deadline=float(os.getenv('LEDGER_QUEUE_DEADLINE', '2')),
+    priority=0
+)
+admission.add_class(
+    "auth",
+    limit=int(os.getenv('AUTH_CONCURRENCY', '8')),
+    max_queue=int(os.getenv('AUTH_QUEUE', '64')),
+    deadline=float(os.getenv('AUTH_QUEUE_DEADLINE', '5')),
+    priority=1
+)
+admission.add_class(
+    "voice",
+    limit=int(os.getenv('VOICE_CONCURRENCY', '8')),
+    max_queue=int(os.getenv('VOICE_QUEUE', '32')),
+    deadline=float(os.getenv('VOICE_QUEUE_DEADLINE', '10')),
+    priority=2
+)
+
+# Rate limits are checked before any hashing or DB work so rejections stay cheap
+# Behind the ingress the socket peer is the proxy; the client is taken from
+# X-Forwarded-For when the peer is in TRUSTED_PROXIES
+rate_limiter = RateLimiter(
+    shared_store or MemoryRateLimitStore(),
+    trusted_proxies=os.getenv('TRUSTED_PROXIES', '127.0.0.0/8,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16')
+)
+rate_limiter.add_rule("login_phone", int(os.getenv('LOGIN_PHONE_LIMIT', '5')), 300)
+rate_limiter.add_rule("login_ip", int(os.getenv('LOGIN_IP_LIMIT', '30')), 60)
+rate_limiter.add_rule("register_phone", int(os.getenv('REGISTER_PHONE_LIMIT', '3')), 3600)
+rate_limiter.add_rule("register_ip", int(os.getenv('REGISTER_IP_LIMIT', '10')), 3600)
+rate_limiter.add_rule("voice_ip", int(os.getenv('VOICE_IP_LIMIT', '30')), 60)
+rate_limiter.add_rule("transfer_user", int(os.getenv('TRANSFER_USER_LIMIT', '10')), 60)
+
 # Pydantic Models
 class UserCreate(BaseModel):
     name: str
@@ -59,7 +140,8 @@ class AccountResponse(BaseModel):
     account_type: str
 
 class TransactionCreate(BaseModel):
-    recipient_phone: str
+    recipient_phone: Optional[str] = None
+    recipient_name: Optional[str] = None
     amount: float
     description: Optional[str] = None
 
@@ -69,6 +151,8 @@ class BillPayment(BaseModel):
     description: Optional[str] = None
 
 class TransactionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     transaction_id: str
     type: str
     amount: float
@@ -77,19 +161,89 @@ class TransactionResponse(BaseModel):
     timestamp: datetime
     status: str
 
+class BatchItem(BaseModel):
+    type: Literal["transfer", "bill_pay"]
+    amount: float = Field(gt=0)
+    recipient_phone: Optional[str] = None
+    bill_type: Optional[str] = None
+    description: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(min_length=1, max_length=500)
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    transaction_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    completed: int
+    failed: int
+    results: List[BatchItemResult]
+
+class InstructionCreate(BaseModel):
+    type: Literal["transfer", "bill_pay"]
+    amount: float = Field(gt=0)
+    frequency: Literal["daily", "weekly", "monthly"]
+    recipient_phone: Optional[str] = None
+    bill_type: Optional[str] = None
+    description: Optional[str] = None
+    start_at: Optional[datetime] = None
+
+class InstructionResponse(BaseModel):
+    instruction_id: str
+    type: str
+    amount: float
+    frequency: str
+    recipient_user_id: Optional[str]
+    bill_type: Optional[str]
+    description: Optional[str]
+    next_run_at: datetime
+    active: bool
+    last_run_at: Optional[datetime]
+    last_status: Optional[str]
+
+# Validates a whole transaction list in one call when building list responses
+transaction_list_adapter = TypeAdapter(List[TransactionResponse])
+
 class PINChange(BaseModel):
     old_pin: str
     new_pin: str
 
+class CategoryTotal(BaseModel):
+    category: str
+    total: float
+    count: int
+
+class InsightsResponse(BaseModel):
+    type: str
+    period: str
+    period_key: str
+    category: Optional[str]
+    total: float
+    count: int
+    top_categories: List[CategoryTotal]
+
 class IntentRequest(BaseModel):
     text: str
+    language: Optional[str] = None
 
 class IntentResponse(BaseModel):
     intent: str
     confidence: float
     entities: dict
+    missing: List[str] = []
+    confirmed: bool = False
 
 # Helper Functions
+def get_ledger(db: Session = Depends(get_db)):
+    ledger = Ledger(db)
+    try:
+        yield ledger
+    finally:
+        ledger.close()
+
 def hash_pin(pin: str) -> str:
     return bcrypt.hashpw(pin.encode(), bcrypt.gensalt()).decode()
 
@@ -110,9 +264,48 @@ def verify_token(token: str) -> str:
     except:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# Rate-limit keys, resolved before the request takes an admission slot
+async def body_phone(request: Request) -> Optional[str]:
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body.get('phone') if isinstance(body, dict) else None
+
+async def token_user(request: Request) -> Optional[str]:
+    token = request.query_params.get('token')
+    return verify_token(token) if token else None
+
+SPENDING_CATEGORIES = ['electricity', 'water', 'gas', 'mobile', 'phone', 'internet', 'rent', 'insurance']
+
+def spending_entities(text: str) -> dict:
+    now = datetime.now(timezone.utc)
+    if 'today' in text:
+        entities = {'period': 'day', 'period_key': now.strftime('%Y-%m-%d'), 'label': 'today'}
+    elif 'last year' in text:
+        entities = {'period': 'year', 'period_key': str(now.year - 1), 'label': 'last year'}
+    elif 'year' in text:
+        entities = {'period': 'year', 'period_key': str(now.year), 'label': 'this year'}
+    elif 'last month' in text:
+        last_month = now.replace(day=1) - timedelta(days=1)
+        entities = {'period': 'month', 'period_key': last_month.strftime('%Y-%m'), 'label': 'last month'}
+    else:
+        entities = {'period': 'month', 'period_key': now.strftime('%Y-%m'), 'label': 'this month'}
+    
+    for category in SPENDING_CATEGORIES:
+        if category in text:
+            entities['category'] = category
+            break
+    return entities
+
 def recognize_intent(text: str) -> dict:
     text = text.lower()
     
+    # Spending summary (before balance, which also matches "how much")
+    if any(word in text for word in ['spend', 'spent', 'expense', 'expenditure', 'kharch']) or (
+            'how much' in text and any(word in text for word in ['paid', 'pay for', 'bills'])):
+        return {'intent': 'spending_summary', 'confidence': 0.9, 'entities': spending_entities(text)}
+    
     # Balance check
     if any(word in text for word in ['balance', 'check balance', 'how much', 'account balance']):
         return {'intent': 'check_balance', 'confidence': 0.9, 'entities': {}}
@@ -144,8 +337,8 @@ def recognize_intent(text: str) -> dict:
 async def root():
     return {"message": "Voice Banking API"}
 
-@api_router.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+@api_router.post("/auth/register", response_model=TokenResponse, dependencies=[rate_limiter.by_client_ip("register_ip"), rate_limiter.by_key("register_phone", body_phone), admit(admission, "auth")])
+async def register(user_data: UserCreate, db: Session = Depends(get_db), ledger: Ledger = Depends(get_ledger)):
     # Check if phone already exists
     existing = db.query(User).filter(User.phone == user_data.phone).first()
     if existing:
@@ -157,7 +350,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         user_id=user_id,
         name=user_data.name,
         phone=user_data.phone,
-        pin_hash=hash_pin(user_data.pin),
+        pin_hash=await run_in_threadpool(hash_pin, user_data.pin),
         language_preference=user_data.language_preference
     )
     db.add(user)
@@ -172,7 +365,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         balance=10000.0,  # Demo balance
         account_type="savings"
     )
-    db.add(account)
+    ledger.session(user_id).add(account)
     
     # Log auth
     log = AuthLog(
@@ -183,15 +376,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     db.add(log)
     
+    # Commit the account shard first so a user is never left without an account
+    ledger.commit()
     db.commit()
     
     token = create_token(user_id)
     return TokenResponse(token=token, user_id=user_id, name=user_data.name)
 
-@api_router.post("/auth/login", response_model=TokenResponse)
+@api_router.post("/auth/login", response_model=TokenResponse, dependencies=[rate_limiter.by_client_ip("login_ip"), rate_limiter.by_key("login_phone", body_phone), admit(admission, "auth")])
 async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.phone == credentials.phone).first()
-    if not user or not verify_pin(credentials.pin, user.pin_hash):
+    if not user or not await run_in_threadpool(verify_pin, credentials.pin, user.pin_hash):
         # Log failed attempt
         if user:
             log = AuthLog(
@@ -217,10 +412,10 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     token = create_token(user.user_id)
     return TokenResponse(token=token, user_id=user.user_id, name=user.name)
 
-@api_router.get("/account", response_model=AccountResponse)
-async def get_account(token: str, db: Session = Depends(get_db)):
+@api_router.get("/account", response_model=AccountResponse, dependencies=[admit(admission, "ledger")])
+async def get_account(token: str, ledger: Ledger = Depends(get_ledger)):
     user_id = verify_token(token)
-    account = db.query(Account).filter(Account.user_id == user_id).first()
+    account = ledger.session(user_id).query(Account).filter(Account.user_id == user_id).first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
@@ -231,130 +426,221 @@ async def get_account(token: str, db: Session = Depends(get_db)):
         account_type=account.account_type
     )
 
-@api_router.post("/transaction/transfer", response_model=TransactionResponse)
-async def transfer_money(token: str, transfer: TransactionCreate, db: Session = Depends(get_db)):
+@api_router.post("/transaction/transfer", response_model=TransactionResponse, dependencies=[rate_limiter.by_key("transfer_user", token_user), admit(admission, "ledger")])
+async def transfer_money(token: str, transfer: TransactionCreate, db: Session = Depends(get_db), ledger: Ledger = Depends(get_ledger)):
+    user_id = verify_token(token)
+    
+    # Get recipient, by phone or by a name from the user's past transfers
+    if transfer.recipient_phone:
+        recipient_user = db.query(User).filter(User.phone == transfer.recipient_phone).first()
+    elif transfer.recipient_name:
+        recipient_user = recipient_directory.resolve(ledger, user_id, transfer.recipient_name)
+    else:
+        raise HTTPException(status_code=400, detail="recipient_phone or recipient_name is required")
+    if not recipient_user:
+        raise HTTPException(status_code=404, detail="Recipient not found")
+    
+    sender_user = db.query(User).filter(User.user_id == user_id).first()
+    transaction = ledger_ops.transfer(
+        ledger, sender_user, recipient_user, transfer.amount, transfer.description
+    )
+    
+    recipient_directory.record_transfer(user_id, recipient_user)
+    
+    return TransactionResponse.model_validate(transaction)
+
+@api_router.post("/transaction/bill-pay", response_model=TransactionResponse, dependencies=[admit(admission, "ledger")])
+async def pay_bill(token: str, bill: BillPayment, ledger: Ledger = Depends(get_ledger)):
     user_id = verify_token(token)
+    db = ledger.session(user_id)
     
-    # Get sender account
-    sender_account = db.query(Account).filter(Account.user_id == user_id).first()
-    if not sender_account:
+    account = db.query(Account).filter(Account.user_id == user_id).first()
+    if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    # Check balance
-    if sender_account.balance < transfer.amount:
-        raise HTTPException(status_code=400, detail="Insufficient balance")
+    transaction = ledger_ops.stage_bill_payment(
+        db, account, bill.bill_type, bill.amount, bill.description
+    )
+    db.commit()
     
-    # Get recipient
-    recipient_user = db.query(User).filter(User.phone == transfer.recipient_phone).first()
-    if not recipient_user:
-        raise HTTPException(status_code=404, detail="Recipient not found")
+    return TransactionResponse.model_validate(transaction)
+
+@api_router.post("/transaction/batch", response_model=BatchResponse, dependencies=[rate_limiter.by_key("transfer_user", token_user), admit(admission, "ledger")])
+async def batch_transactions(token: str, batch: BatchRequest, db: Session = Depends(get_db), ledger: Ledger = Depends(get_ledger)):
+    user_id = verify_token(token)
     
-    recipient_account = db.query(Account).filter(Account.user_id == recipient_user.user_id).first()
+    # Resolve every recipient in one query
+    phones = {item.recipient_phone for item in batch.items if item.type == "transfer" and item.recipient_phone}
+    recipients = {u.phone: u for u in db.query(User).filter(User.phone.in_(phones))} if phones else {}
     
-    # Deduct from sender
-    sender_account.balance -= transfer.amount
+    sender_user = db.query(User).filter(User.user_id == user_id).first()
+    results = ledger_ops.apply_batch(ledger, sender_user, batch.items, recipients)
     
-    # Add to recipient
-    recipient_account.balance += transfer.amount
+    for item, result in zip(batch.items, results):
+        if item.type == "transfer" and result["status"] != "failed":
+            recipient_directory.record_transfer(user_id, recipients[item.recipient_phone])
     
-    # Create transaction record
-    transaction_id = str(uuid.uuid4())
-    transaction = Transaction(
-        transaction_id=transaction_id,
-        account_id=sender_account.account_id,
-        type="debit",
-        amount=transfer.amount,
-        recipient=recipient_user.name,
-        description=transfer.description or f"Transfer to {recipient_user.name}",
-        status="completed"
+    failed = sum(1 for r in results if r["status"] == "failed")
+    return BatchResponse(
+        completed=len(results) - failed,
+        failed=failed,
+        results=[BatchItemResult(**r) for r in results]
     )
-    db.add(transaction)
-    
-    # Create credit transaction for recipient
-    recipient_transaction = Transaction(
-        transaction_id=str(uuid.uuid4()),
-        account_id=recipient_account.account_id,
-        type="credit",
-        amount=transfer.amount,
-        recipient=db.query(User).filter(User.user_id == user_id).first().name,
-        description=transfer.description or f"Received from sender",
-        status="completed"
+
+@api_router.post("/instructions", response_model=InstructionResponse, dependencies=[admit(admission, "ledger")])
+async def create_instruction(token: str, instruction: InstructionCreate, db: Session = Depends(get_db)):
+    user_id = verify_token(token)
+    
+    recipient_user_id = None
+    if instruction.type == "transfer":
+        if not instruction.recipient_phone:
+            raise HTTPException(status_code=400, detail="recipient_phone is required")
+        recipient_user = db.query(User).filter(User.phone == instruction.recipient_phone).first()
+        if not recipient_user:
+            raise HTTPException(status_code=404, detail="Recipient not found")
+        recipient_user_id = recipient_user.user_id
+    elif not instruction.bill_type:
+        raise HTTPException(status_code=400, detail="bill_type is required")
+    
+    start_at = scheduler.utc_naive(instruction.start_at or datetime.now(timezone.utc))
+    standing = StandingInstruction(
+        instruction_id=str(uuid.uuid4()),
+        user_id=user_id,
+        type=instruction.type,
+        recipient_user_id=recipient_user_id,
+        bill_type=instruction.bill_type,
+        amount=instruction.amount,
+        description=instruction.description,
+        frequency=instruction.frequency,
+        start_at=start_at,
+        next_run_at=start_at,
+        active=True
     )
-    db.add(recipient_transaction)
+    db.add(standing)
+    db.commit()
     
+    return InstructionResponse.model_validate(standing, from_attributes=True)
+
+@api_router.get("/instructions", response_model=List[InstructionResponse], dependencies=[admit(admission, "ledger")])
+async def list_instructions(token: str, db: Session = Depends(get_db)):
+    user_id = verify_token(token)
+    
+    instructions = db.query(StandingInstruction).filter(
+        StandingInstruction.user_id == user_id
+    ).order_by(StandingInstruction.next_run_at).all()
+    
+    return [InstructionResponse.model_validate(i, from_attributes=True) for i in instructions]
+
+@api_router.delete("/instructions/{instruction_id}", dependencies=[admit(admission, "ledger")])
+async def cancel_instruction(instruction_id: str, token: str, db: Session = Depends(get_db)):
+    user_id = verify_token(token)
+    
+    instruction = db.query(StandingInstruction).filter(
+        StandingInstruction.instruction_id == instruction_id,
+        StandingInstruction.user_id == user_id
+    ).first()
+    if not instruction:
+        raise HTTPException(status_code=404, detail="Instruction not found")
+    
+    instruction.active = False
     db.commit()
     
-    return TransactionResponse(
-        transaction_id=transaction_id,
-        type=transaction.type,
-        amount=transaction.amount,
-        recipient=transaction.recipient,
-        description=transaction.description,
-        timestamp=transaction.timestamp,
-        status=transaction.status
-    )
+    return {"message": "Instruction cancelled"}
 
-@api_router.post("/transaction/bill-pay", response_model=TransactionResponse)
-async def pay_bill(token: str, bill: BillPayment, db: Session = Depends(get_db)):
+@api_router.get("/transactions", response_model=List[TransactionResponse], dependencies=[admit(admission, "ledger")])
+async def get_transactions(token: str, limit: int = 10, ledger: Ledger = Depends(get_ledger)):
     user_id = verify_token(token)
+    db = ledger.session(user_id)
     
     account = db.query(Account).filter(Account.user_id == user_id).first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    if account.balance < bill.amount:
-        raise HTTPException(status_code=400, detail="Insufficient balance")
-    
-    # Deduct amount
-    account.balance -= bill.amount
+    # Select only the response columns so no ORM objects are built
+    rows = db.query(
+        Transaction.transaction_id,
+        Transaction.type,
+        Transaction.amount,
+        Transaction.recipient,
+        Transaction.description,
+        Transaction.timestamp,
+        Transaction.status
+    ).filter(
+        Transaction.account_id == account.account_id
+    ).order_by(Transaction.timestamp.desc()).limit(limit).all()
     
-    # Create transaction
-    transaction_id = str(uuid.uuid4())
-    transaction = Transaction(
-        transaction_id=transaction_id,
-        account_id=account.account_id,
-        type="debit",
-        amount=bill.amount,
-        recipient=bill.bill_type,
-        description=bill.description or f"{bill.bill_type} bill payment",
-        status="completed"
-    )
-    db.add(transaction)
-    db.commit()
+    # Validate once from the rows and return the response directly, so
+    # FastAPI doesn't re-validate and re-encode the list
+    transactions = transaction_list_adapter.validate_python(rows, from_attributes=True)
+    return ORJSONResponse(transaction_list_adapter.dump_python(transactions))
+
+@api_router.get("/events")
+async def stream_events(token: str):
+    user_id = verify_token(token)
     
-    return TransactionResponse(
-        transaction_id=transaction_id,
-        type=transaction.type,
-        amount=transaction.amount,
-        recipient=transaction.recipient,
-        description=transaction.description,
-        timestamp=transaction.timestamp,
-        status=transaction.status
+    async def event_stream():
+        queue = event_bus.subscribe(user_id)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle connection
+                    yield b": keepalive\n\n"
+                    continue
+                yield format_sse(payload)
+        finally:
+            event_bus.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-@api_router.get("/transactions", response_model=List[TransactionResponse])
-async def get_transactions(token: str, limit: int = 10, db: Session = Depends(get_db)):
+@api_router.get("/events/stats")
+async def event_stats():
+    return event_bus.stats()
+
+@api_router.get("/insights", response_model=InsightsResponse, dependencies=[admit(admission, "ledger")])
+async def get_insights(
+    token: str,
+    period: Literal["day", "month", "year"] = "month",
+    period_key: Optional[str] = None,
+    category: Optional[str] = None,
+    type: Literal["debit", "credit"] = "debit",
+    ledger: Ledger = Depends(get_ledger)
+):
     user_id = verify_token(token)
+    db = ledger.session(user_id)
     
     account = db.query(Account).filter(Account.user_id == user_id).first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    transactions = db.query(Transaction).filter(
-        Transaction.account_id == account.account_id
-    ).order_by(Transaction.timestamp.desc()).limit(limit).all()
+    period_key = period_key or insights.period_keys(datetime.now(timezone.utc))[period]
+    summary = insights.lookup(
+        db, account.account_id, type, period, period_key,
+        insights.category_for(category) if category else insights.ALL
+    )
     
-    return [TransactionResponse(
-        transaction_id=t.transaction_id,
-        type=t.type,
-        amount=t.amount,
-        recipient=t.recipient,
-        description=t.description,
-        timestamp=t.timestamp,
-        status=t.status
-    ) for t in transactions]
-
-@api_router.post("/auth/change-pin")
+    return InsightsResponse(
+        type=type,
+        period=period,
+        period_key=period_key,
+        category=category,
+        total=summary["total"],
+        count=summary["count"],
+        top_categories=insights.top_categories(db, account.account_id, type, period, period_key)
+    )
+
+@api_router.get("/recipients/search")
+async def search_recipients(token: str, q: str, limit: int = 5, ledger: Ledger = Depends(get_ledger)):
+    user_id = verify_token(token)
+    return recipient_directory.search(ledger, user_id, q, limit=min(limit, 20))
+
+@api_router.post("/auth/change-pin", dependencies=[admit(admission, "auth")])
 async def change_pin(token: str, pin_change: PINChange, db: Session = Depends(get_db)):
     user_id = verify_token(token)
     
@@ -362,25 +648,21 @@ async def change_pin(token: str, pin_change: PINChange, db: Session = Depends(ge
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if not verify_pin(pin_change.old_pin, user.pin_hash):
+    if not await run_in_threadpool(verify_pin, pin_change.old_pin, user.pin_hash):
         raise HTTPException(status_code=401, detail="Invalid old PIN")
     
-    user.pin_hash = hash_pin(pin_change.new_pin)
+    user.pin_hash = await run_in_threadpool(hash_pin, pin_change.new_pin)
     db.commit()
     
     return {"message": "PIN changed successfully"}
 
-@api_router.post("/voice/transcribe")
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_bytes(content: bytes) -> str:
+    # Create a temporary file
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as temp_file:
+        temp_file.write(content)
+        temp_file_path = temp_file.name
+    
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
         # Transcribe
         with open(temp_file_path, 'rb') as audio_file:
             response = await stt.transcribe(
@@ -388,15 +670,32 @@ async def transcribe_audio(file: UploadFile = File(...)):
                 model="whisper-1",
                 response_format="json"
             )
-        
+    finally:
         # Clean up temp file
         os.unlink(temp_file_path)
+    
+    return response.text
+
+@api_router.post("/voice/transcribe", dependencies=[rate_limiter.by_client_ip("voice_ip"), admit(admission, "voice")])
+async def transcribe_audio(file: UploadFile = File(...)):
+    try:
+        # Read file content
+        content = await file.read()
         
-        return {"text": response.text}
+        text = await transcript_cache.get_or_load(
+            audio_fingerprint(content),
+            lambda: transcribe_bytes(content)
+        )
+        
+        return {"text": text}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
-@api_router.post("/voice/synthesize")
+@api_router.get("/voice/transcribe/stats")
+async def transcribe_cache_stats():
+    return transcript_cache.stats()
+
+@api_router.post("/voice/synthesize", dependencies=[rate_limiter.by_client_ip("voice_ip"), admit(admission, "voice")])
 async def synthesize_speech(text: str, voice: str = "nova"):
     try:
         audio_bytes = await tts.generate_speech(
@@ -414,13 +713,103 @@ async def synthesize_speech(text: str, voice: str = "nova"):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Speech synthesis failed: {str(e)}")
 
+@api_router.get("/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+async def conversation_call(method, *args):
+    # The shared store does blocking SQLite I/O; the local one is just a dict
+    if conversation_store.backend is None:
+        return method(*args)
+    return await run_in_threadpool(method, *args)
+
+CONFIRM_WORDS = {'yes', 'confirm', 'haan', 'ha', 'okay', 'ok', 'हाँ', 'हां'}
+
 @api_router.post("/intent/recognize", response_model=IntentResponse)
-async def recognize_intent_endpoint(request: IntentRequest):
+async def recognize_intent_endpoint(request: IntentRequest, token: Optional[str] = None):
     result = recognize_intent(request.text)
-    return IntentResponse(**result)
+    if not token:
+        return IntentResponse(**result)
+    
+    # Signed-in users continue their pending flow instead of starting over
+    user_id = verify_token(token)
+    words = {word.strip('.,!?') for word in request.text.lower().split()}
+    state = await conversation_call(conversation_store.get, user_id)
+    if state is not None and result['intent'] in ('unknown', state.intent):
+        if not state.missing() and words & CONFIRM_WORDS:
+            await conversation_call(conversation_store.clear, user_id)
+            return IntentResponse(
+                intent=state.intent, confidence=0.9, entities=state.entities, confirmed=True
+            )
+        state.merge(extract_entities(request.text, SPENDING_CATEGORIES, state.missing()))
+    elif result['intent'] in REQUIRED_SLOTS:
+        state = ConversationState(
+            result['intent'], extract_entities(request.text, SPENDING_CATEGORIES),
+            request.language or 'en', 0
+        )
+    else:
+        if state is not None:
+            await conversation_call(conversation_store.clear, user_id)
+        return IntentResponse(**result)
+    
+    await conversation_call(conversation_store.set, user_id, state)
+    return IntentResponse(
+        intent=state.intent, confidence=0.9, entities=state.entities or {}, missing=state.missing()
+    )
+
+@api_router.get("/conversation")
+async def get_conversation(token: str):
+    user_id = verify_token(token)
+    state = await conversation_call(conversation_store.get, user_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No pending conversation")
+    return {
+        "intent": state.intent,
+        "entities": state.entities or {},
+        "language": state.language,
+        "missing": state.missing(),
+        "expires_at": state.expires_at,
+    }
+
+@api_router.delete("/conversation")
+async def clear_conversation(token: str):
+    await conversation_call(conversation_store.clear, verify_token(token))
+    return {"message": "Conversation cleared"}
+
+@api_router.get("/conversation/stats")
+async def conversation_stats():
+    return conversation_store.stats()
+
+@app.on_event("startup")
+async def start_event_bus():
+    event_bus.start()
+
+@app.on_event("shutdown")
+async def stop_event_bus():
+    await event_bus.stop()
+
+@app.on_event("startup")
+def recover_pending_transfers():
+    # The scheduler keeps retrying; this covers deployments without one
+    recovered = scheduler.recover_pending_transfers()
+    if recovered:
+        logger.info("Recovered %d pending cross-shard transfers", recovered)
 
 app.include_router(api_router)
 
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip that leaves Server-Sent Events alone, as compression buffers them."""
+    
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"accept" and b"text/event-stream" in value:
+                    await self.app(scope, receive, send)
+                    return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=1000)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
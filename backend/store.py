@@ -0,0 +1,131 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from ratelimit import RateLimitStore, sliding_window
+
+
+class SQLiteSharedStore(RateLimitStore):
+    """Key/value and rate-limit store shared by all workers on one host.
+
+    Backed by a local SQLite file in WAL mode, so gunicorn/uvicorn workers
+    see the same cached transcripts, rate-limit counters and ledger events
+    without running a separate cache server.
+    """
+
+    def __init__(self, path: str, event_retention: float = 300, purge_every: int = 1000):
+        self.path = path
+        self.event_retention = event_retention
+        self.purge_every = purge_every
+        self._appended = 0
+        self._writes = 0
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS kv (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                window_start REAL NOT NULL,
+                previous INTEGER NOT NULL,
+                current INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl)
+        )
+        self._wrote()
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def _wrote(self) -> None:
+        # Reads skip expired rows; they are deleted every purge_every writes
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM kv WHERE expires_at < ?", (now,)).rowcount
+        # Rate-limit rows are stale once both tracked windows have passed
+        conn.execute("DELETE FROM rate_limits WHERE window_start < ?", (now - 86400,))
+        return removed
+
+    def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.time()
+        conn = self._conn()
+        # BEGIN IMMEDIATE serialises the read-modify-write across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_start, previous, current FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            window_start, previous, current = row if row else (0.0, 0, 0)
+            window_start, previous, current, retry_after = sliding_window(
+                window_start, previous, current, now, limit, window
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, window_start, previous, current) VALUES (?, ?, ?, ?)",
+                (key, window_start, previous, current)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._wrote()
+        return retry_after
+
+    def append_event(self, user_id: str, payload: dict) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO events (user_id, payload, created_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(payload), now)
+        )
+        self._appended += 1
+        if self._appended % 1000 == 0:
+            conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.event_retention,))
+
+    def last_event_id(self) -> int:
+        row = self._conn().execute("SELECT MAX(event_id) FROM events").fetchone()
+        return row[0] or 0
+
+    def events_after(self, event_id: int, limit: int = 1000) -> list:
+        rows = self._conn().execute(
+            "SELECT event_id, user_id, payload FROM events WHERE event_id > ? ORDER BY event_id LIMIT ?",
+            (event_id, limit)
+        ).fetchall()
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
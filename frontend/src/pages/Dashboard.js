@@ -9,6 +9,24 @@ import { motion, AnimatePresence } from 'framer-motion';
 import { toast } from 'sonner';
 import VoiceRecorder from '../components/VoiceRecorder';
 
+// Spoken replies follow the browser language; the server keeps it with the conversation
+const language = (navigator.language || 'en').split('-')[0];
+
+// What to ask for next in a multi-turn transfer or bill payment
+const nextPrompt = (intent, entities, missing) => {
+  const slot = missing[0];
+  if (slot === 'recipient') return 'Who would you like to send money to?';
+  if (slot === 'bill_type') return 'Which bill would you like to pay?';
+  if (slot === 'amount') {
+    return intent === 'pay_bill'
+      ? `How much is the ${entities.bill_type} bill?`
+      : `How much would you like to send to ${entities.recipient}?`;
+  }
+  return intent === 'pay_bill'
+    ? `Pay ${entities.amount.toFixed(2)} dollars for ${entities.bill_type}? Say yes to confirm`
+    : `Send ${entities.amount.toFixed(2)} dollars to ${entities.recipient}? Say yes to confirm`;
+};
+
 const Dashboard = ({ token, userName, onLogout }) => {
   const [account, setAccount] = useState(null);
   const [transactions, setTransactions] = useState([]);
@@ -18,12 +36,47 @@ const Dashboard = ({ token, userName, onLogout }) => {
   const [currentOperation, setCurrentOperation] = useState(null);
   const [operationData, setOperationData] = useState({});
   const audioRef = useRef(null);
+  const eventsConnected = useRef(false);
+  const lastEventAt = useRef(0);
 
   useEffect(() => {
     fetchAccount();
     fetchTransactions();
   }, []);
 
+  // Balance changes and new transactions are pushed by the server
+  useEffect(() => {
+    const events = new EventSource(`${API}/events?token=${encodeURIComponent(token)}`);
+    events.onopen = () => { eventsConnected.current = true; };
+    events.onerror = () => { eventsConnected.current = false; };
+    events.addEventListener('transaction', (event) => {
+      const data = JSON.parse(event.data);
+      lastEventAt.current = Date.now();
+      setAccount((current) => current && { ...current, balance: data.balance });
+      setTransactions((current) => [
+        data.transaction,
+        ...current.filter((t) => t.transaction_id !== data.transaction.transaction_id)
+      ].slice(0, 5));
+    });
+    return () => events.close();
+  }, [token]);
+
+  // Fall back to refetching when the stream is down, or when no event shows
+  // up for a write that another worker handled without a shared store
+  const refreshAfterWrite = (startedAt) => {
+    if (!eventsConnected.current) {
+      fetchAccount();
+      fetchTransactions();
+      return;
+    }
+    setTimeout(() => {
+      if (lastEventAt.current < startedAt) {
+        fetchAccount();
+        fetchTransactions();
+      }
+    }, 2000);
+  };
+
   const fetchAccount = async () => {
     try {
       const response = await axios.get(`${API}/account`, { params: { token } });
@@ -66,8 +119,9 @@ const Dashboard = ({ token, userName, onLogout }) => {
 
   const processVoiceCommand = async (text) => {
     try {
-      const intentResponse = await axios.post(`${API}/intent/recognize`, { text });
-      const intent = intentResponse.data.intent;
+      // With the token the server keeps the pending flow, so answers can come one at a time
+      const intentResponse = await axios.post(`${API}/intent/recognize`, { text, language }, { params: { token } });
+      const { intent, entities, missing, confirmed } = intentResponse.data;
       
       let responseText = '';
       
@@ -84,14 +138,20 @@ const Dashboard = ({ token, userName, onLogout }) => {
           ).join('. ')}`;
           break;
           
+        case 'spending_summary':
+          const { period, period_key, category, label } = entities;
+          const insights = await axios.get(`${API}/insights`, {
+            params: { token, period, period_key, category }
+          });
+          responseText = `You spent ${insights.data.total.toFixed(2)} dollars${category ? ` on ${category}` : ''} ${label}, across ${insights.data.count} payments`;
+          break;
+          
         case 'transfer_money':
-          setCurrentOperation('transfer');
-          responseText = 'Please enter the recipient phone number and amount';
+          responseText = confirmed ? await voiceTransfer(entities) : nextPrompt(intent, entities, missing);
           break;
           
         case 'pay_bill':
-          setCurrentOperation('bill');
-          responseText = 'Please enter the bill type and amount';
+          responseText = confirmed ? await voiceBillPay(entities) : nextPrompt(intent, entities, missing);
           break;
           
         case 'help':
@@ -137,6 +197,55 @@ const Dashboard = ({ token, userName, onLogout }) => {
     }
   };
 
+  const postTransfer = async (recipient, amount) => {
+    const startedAt = Date.now();
+    await axios.post(`${API}/transaction/transfer`, {
+      ...recipient,
+      amount,
+      description: 'Voice transfer'
+    }, { params: { token } });
+    
+    toast.success('Transfer successful!');
+    refreshAfterWrite(startedAt);
+  };
+
+  const postBillPayment = async (billType, amount) => {
+    const startedAt = Date.now();
+    await axios.post(`${API}/transaction/bill-pay`, {
+      bill_type: billType,
+      amount,
+      description: `${billType} bill payment`
+    }, { params: { token } });
+    
+    toast.success('Bill paid successfully!');
+    refreshAfterWrite(startedAt);
+  };
+
+  const voiceTransfer = async ({ recipient, amount }) => {
+    try {
+      await postTransfer({ recipient_name: recipient }, amount);
+      return `Sent ${amount.toFixed(2)} dollars to ${recipient}`;
+    } catch (error) {
+      const detail = error.response?.data?.detail;
+      if (error.response?.status === 409) {
+        // Several past recipients match the name; let the user pick one
+        setCurrentOperation('transfer');
+        setOperationData({ amount: String(amount), candidates: detail.candidates });
+        return `I found more than one ${recipient}. Please choose who you meant`;
+      }
+      return typeof detail === 'string' ? detail : 'Transfer failed';
+    }
+  };
+
+  const voiceBillPay = async ({ bill_type, amount }) => {
+    try {
+      await postBillPayment(bill_type, amount);
+      return `Paid ${amount.toFixed(2)} dollars for ${bill_type}`;
+    } catch (error) {
+      return error.response?.data?.detail || 'Bill payment failed';
+    }
+  };
+
   const handleTransfer = async () => {
     if (!operationData.phone || !operationData.amount) {
       toast.error('Please enter phone number and amount');
@@ -144,15 +253,7 @@ const Dashboard = ({ token, userName, onLogout }) => {
     }
     
     try {
-      await axios.post(`${API}/transaction/transfer`, {
-        recipient_phone: operationData.phone,
-        amount: parseFloat(operationData.amount),
-        description: 'Voice transfer'
-      }, { params: { token } });
-      
-      toast.success('Transfer successful!');
-      fetchAccount();
-      fetchTransactions();
+      await postTransfer({ recipient_phone: operationData.phone }, parseFloat(operationData.amount));
       setCurrentOperation(null);
       setOperationData({});
       
@@ -169,15 +270,7 @@ const Dashboard = ({ token, userName, onLogout }) => {
     }
     
     try {
-      await axios.post(`${API}/transaction/bill-pay`, {
-        bill_type: operationData.billType,
-        amount: parseFloat(operationData.amount),
-        description: `${operationData.billType} bill payment`
-      }, { params: { token } });
-      
-      toast.success('Bill paid successfully!');
-      fetchAccount();
-      fetchTransactions();
+      await postBillPayment(operationData.billType, parseFloat(operationData.amount));
       setCurrentOperation(null);
       setOperationData({});
       
@@ -317,6 +410,20 @@ const Dashboard = ({ token, userName, onLogout }) => {
                   <Card className="p-6 shadow-lg" data-testid="transfer-form">
                     <h3 className="text-2xl font-bold text-gray-900 mb-4">Transfer Money</h3>
                     <div className="space-y-4">
+                      {operationData.candidates && (
+                        <div className="flex flex-wrap gap-2" data-testid="recipient-candidates">
+                          {operationData.candidates.map((c) => (
+                            <Button
+                              key={c.user_id}
+                              variant={operationData.phone === c.phone ? 'default' : 'outline'}
+                              onClick={() => setOperationData({ ...operationData, phone: c.phone })}
+                              className="h-11"
+                            >
+                              {c.name} ({c.phone})
+                            </Button>
+                          ))}
+                        </div>
+                      )}
                       <div>
                         <label className="block text-base font-medium text-gray-700 mb-2">Recipient Phone</label>
                         <Input
@@ -0,0 +1,60 @@
+"""Memory and speed of ConversationStore with many live sessions.
+
+    python tests/bench_conversation.py --sessions 1000000
+
+Allocations are measured with tracemalloc, excluding the user id strings
+themselves, which the application holds anyway.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from conversation import ConversationState, ConversationStore
+
+
+def fill(user_ids, with_entities: bool) -> int:
+    tracemalloc.start()
+    store = ConversationStore(max_sessions=len(user_ids), ttl=300)
+    for i, user_id in enumerate(user_ids):
+        entities = {"amount": 500.0} if with_entities and i % 2 else None
+        store.set(user_id, ConversationState("transfer_money", entities, "en", 0))
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000000)
+    args = parser.parse_args()
+    user_ids = [str(uuid.uuid4()) for _ in range(args.sessions)]
+
+    for label, with_entities in (("no entities", False), ("half with an amount", True)):
+        used = fill(user_ids, with_entities)
+        print(f"{args.sessions} sessions, {label}: {used / 1e6:.0f} MB ({used / args.sessions:.0f} B/session)")
+
+    store = ConversationStore(max_sessions=args.sessions, ttl=300)
+    started = time.perf_counter()
+    for user_id in user_ids:
+        store.set(user_id, ConversationState("transfer_money", None, "en", 0))
+    set_ns = (time.perf_counter() - started) / args.sessions * 1e9
+    started = time.perf_counter()
+    for user_id in user_ids:
+        store.get(user_id)
+    get_ns = (time.perf_counter() - started) / args.sessions * 1e9
+    print(f"set {set_ns:.0f} ns, get {get_ns:.0f} ns")
+
+    # The cap bounds memory however many users start a conversation
+    capped = ConversationStore(max_sessions=args.sessions // 10, ttl=300)
+    for user_id in user_ids:
+        capped.set(user_id, ConversationState("transfer_money", None, "en", 0))
+    print(f"capped at {capped.max_sessions}: {capped.stats()['sessions']} kept, {capped.stats()['evicted']} evicted")
+
+
+if __name__ == "__main__":
+    main()
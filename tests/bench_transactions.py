@@ -0,0 +1,101 @@
+"""Cost of building the /api/transactions response for 1k transactions.
+
+    python tests/bench_transactions.py
+
+"before" is the original path: load ORM objects, build one
+TransactionResponse per row and let FastAPI validate and JSON-encode the
+list. "after" is the current one: select the response columns, validate
+them once with ``transaction_list_adapter`` and encode with orjson.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+ROWS = 1000
+
+
+def timed(fn, runs: int = 50) -> float:
+    for _ in range(5):
+        fn()
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - started) / runs * 1000
+
+
+def main() -> None:
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault("JWT_SECRET", "bench")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    import server
+    from database import SessionLocal, Transaction
+    from server import TransactionResponse, transaction_list_adapter
+
+    db = SessionLocal()
+    db.add_all([
+        Transaction(
+            transaction_id=str(uuid.uuid4()), account_id="bench", type="debit", amount=12.5,
+            recipient="Ramesh", description="Transfer to Ramesh", status="completed"
+        )
+        for _ in range(ROWS)
+    ])
+    db.commit()
+
+    loop = asyncio.new_event_loop()
+    field = create_response_field(name="response", type_=List[TransactionResponse])
+    columns = [
+        Transaction.transaction_id, Transaction.type, Transaction.amount, Transaction.recipient,
+        Transaction.description, Transaction.timestamp, Transaction.status
+    ]
+
+    def load_objects():
+        return db.query(Transaction).filter(Transaction.account_id == "bench").order_by(
+            Transaction.timestamp.desc()).limit(ROWS).all()
+
+    def load_rows():
+        return db.query(*columns).filter(Transaction.account_id == "bench").order_by(
+            Transaction.timestamp.desc()).limit(ROWS).all()
+
+    def before(transactions):
+        response = [
+            TransactionResponse(
+                transaction_id=t.transaction_id, type=t.type, amount=t.amount, recipient=t.recipient,
+                description=t.description, timestamp=t.timestamp, status=t.status
+            )
+            for t in transactions
+        ]
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=response, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    def after(rows):
+        transactions = transaction_list_adapter.validate_python(rows, from_attributes=True)
+        return ORJSONResponse(transaction_list_adapter.dump_python(transactions)).body
+
+    objects, rows = load_objects(), load_rows()
+    assert len(before(objects)) and len(after(rows))
+    print(f"serialize 1k:        before {timed(lambda: before(objects)):.2f} ms, after {timed(lambda: after(rows)):.2f} ms")
+
+    def fresh(load):
+        db.expunge_all()
+        return load()
+
+    print(f"query + serialize 1k: before {timed(lambda: before(fresh(load_objects))):.2f} ms, "
+          f"after {timed(lambda: after(fresh(load_rows))):.2f} ms")
+    db.close()
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Transfer throughput with several worker processes and ledger shards.
+
+    python tests/bench_transfers.py --workers 4 --shards 1
+    python tests/bench_transfers.py --workers 4 --shards 4 --pairs partitioned
+
+Each worker process runs transfers, as gunicorn workers would, against
+fresh SQLite files in a temporary directory. With ``--pairs random`` most
+transfers cross shards; with ``--pairs partitioned`` each worker keeps to
+the users of one shard, so shards don't contend for each other's write
+lock. A single worker runs the same workload first as the baseline.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+
+def setup(users: int) -> list:
+    import database
+    from database import Account, User
+
+    database.init_db()
+    db = database.SessionLocal()
+    ledger = database.Ledger(db)
+    user_ids = []
+    for i in range(users):
+        user_id = str(uuid.uuid4())
+        db.add(User(user_id=user_id, name=f"User {i}", phone=f"9{i:09d}", pin_hash="x"))
+        ledger.session(user_id).add(Account(
+            account_id=str(uuid.uuid4()), user_id=user_id, account_number=f"ACC{i:08d}", balance=1e9
+        ))
+        user_ids.append(user_id)
+    ledger.commit()
+    db.commit()
+    ledger.close()
+    db.close()
+    database.dispose_engines()
+    return user_ids
+
+
+def worker(groups: list, transfers: int, seed: int) -> None:
+    import database
+    import ledger as ledger_ops
+    from database import User
+
+    rng = random.Random(seed)
+    db = database.SessionLocal()
+    users = {u.user_id: u for u in db.query(User)}
+    for _ in range(transfers):
+        sender, recipient = rng.sample(rng.choice(groups), 2)
+        ledger = database.Ledger(db)
+        try:
+            ledger_ops.transfer(ledger, users[sender], users[recipient], 1.0)
+        finally:
+            ledger.close()
+    db.close()
+
+
+def run(worker_groups: list, transfers: int) -> float:
+    """Run one worker process per entry in ``worker_groups``; returns transfers/s."""
+    processes = [
+        multiprocessing.Process(target=worker, args=(groups, transfers, seed))
+        for seed, groups in enumerate(worker_groups)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    failed = [p.exitcode for p in processes if p.exitcode]
+    if failed:
+        sys.exit(f"{len(failed)} worker(s) failed")
+    return len(worker_groups) * transfers / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--pairs", choices=["random", "partitioned"], default="random")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--transfers", type=int, default=500, help="per worker")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ["LEDGER_SHARDS"] = str(args.shards)
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+    user_ids = setup(args.users)
+    if args.pairs == "partitioned":
+        from database import shard_for
+        groups = [[u for u in user_ids if shard_for(u) == shard] for shard in range(args.shards)]
+        worker_groups = [[groups[i % args.shards]] for i in range(args.workers)]
+    else:
+        groups = [user_ids]
+        worker_groups = [groups] * args.workers
+
+    baseline = run([groups], args.transfers)
+    throughput = run(worker_groups, args.transfers)
+
+    import database
+    from database import Account
+    ledger = database.Ledger(database.SessionLocal())
+    money = sum(
+        balance for shard in range(args.shards)
+        for (balance,) in ledger.shard_session(shard).query(Account.balance)
+    )
+    assert money == args.users * 1e9, "money was created or lost"
+    ledger.close()
+
+    print(f"{args.shards} shard(s), {args.pairs} pairs: 1 worker {baseline:.0f}/s, "
+          f"{args.workers} workers {throughput:.0f}/s ({throughput / baseline:.2f}x) on {os.cpu_count()} CPU(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+# Backend modules import each other as top-level modules, as under uvicorn
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import database
+from database import Account, User
+
+
+@pytest.fixture(params=[2])
+def ledger_db(request, tmp_path):
+    """Point the database module at fresh SQLite files with ``param`` ledger shards."""
+    shards = request.param
+    saved = (database.engine, database.LEDGER_SHARDS, database.ledger_engines, database.LedgerSessions)
+
+    database.engine = database.make_engine(f"sqlite:///{tmp_path}/voice_banking.db")
+    database.LEDGER_SHARDS = shards
+    database.ledger_engines = [database.engine] if shards == 1 else [
+        database.make_engine(f"sqlite:///{tmp_path}/voice_banking_ledger_{shard}.db") for shard in range(shards)
+    ]
+    database.LedgerSessions = [
+        sessionmaker(autocommit=False, autoflush=False, bind=shard_engine) for shard_engine in database.ledger_engines
+    ]
+    database.SessionLocal.configure(bind=database.engine)
+    database.init_db()
+
+    db = database.SessionLocal()
+    ledger = database.Ledger(db)
+    yield ledger
+
+    ledger.close()
+    db.close()
+    database.dispose_engines()
+    database.engine, database.LEDGER_SHARDS, database.ledger_engines, database.LedgerSessions = saved
+    database.SessionLocal.configure(bind=database.engine)
+
+
+def user_on_shard(shard: int) -> str:
+    while True:
+        user_id = str(uuid.uuid4())
+        if database.shard_for(user_id) == shard:
+            return user_id
+
+
+@pytest.fixture
+def make_user(ledger_db):
+    """Create a user and account with ``balance``, optionally on a given shard."""
+    count = 0
+
+    def make(name: str, balance: float = 10000.0, shard: int = 0) -> User:
+        nonlocal count
+        count += 1
+        user = User(user_id=user_on_shard(shard), name=name, phone=f"90000{count:05d}", pin_hash="x")
+        ledger_db.db.add(user)
+        ledger_db.session(user.user_id).add(Account(
+            account_id=str(uuid.uuid4()),
+            user_id=user.user_id,
+            account_number=f"ACC{count:08d}",
+            balance=balance
+        ))
+        ledger_db.commit()
+        ledger_db.db.commit()
+        return user
+
+    return make
+
+
+@pytest.fixture
+def balance_of(ledger_db):
+    def balance(user: User) -> float:
+        session = ledger_db.session(user.user_id)
+        session.expire_all()
+        return session.query(Account).filter(Account.user_id == user.user_id).one().balance
+
+    return balance
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from admission import AdmissionController
+
+
+def controller(total_limit=10, ledger_limit=1, auth_limit=5, deadline=1.0, max_queue=5):
+    c = AdmissionController(total_limit=total_limit)
+    c.add_class("ledger", limit=ledger_limit, max_queue=max_queue, deadline=deadline, priority=0)
+    c.add_class("auth", limit=auth_limit, max_queue=max_queue, deadline=deadline, priority=1)
+    return c
+
+
+def test_lower_priority_runs_when_higher_waits_on_its_own_limit():
+    async def main():
+        c = controller()
+        await c.acquire("ledger")
+        waiter = asyncio.create_task(c.acquire("ledger"))
+        await asyncio.sleep(0)
+        assert c.stats()["classes"]["ledger"]["queue_length"] == 1
+
+        await asyncio.wait_for(c.acquire("auth"), 0.1)
+        assert c.stats()["classes"]["auth"]["active"] == 1
+
+        c.release("ledger")
+        await waiter
+        assert c.stats()["classes"]["ledger"]["active"] == 1
+
+    asyncio.run(main())
+
+
+def test_freed_total_slot_goes_to_higher_priority_first():
+    async def main():
+        c = controller(total_limit=2, ledger_limit=2, auth_limit=2)
+        await c.acquire("auth")
+        await c.acquire("auth")
+        order = []
+
+        async def run(name):
+            await c.acquire(name)
+            order.append(name)
+
+        auth = asyncio.create_task(run("auth"))
+        await asyncio.sleep(0)
+        ledger = asyncio.create_task(run("ledger"))
+        await asyncio.sleep(0)
+
+        # A new ledger request must queue behind the total, not jump it
+        assert c.stats()["classes"]["ledger"]["queue_length"] == 1
+        c.release("auth")
+        await ledger
+        assert order == ["ledger"]
+        c.release("auth")
+        await auth
+        assert order == ["ledger", "auth"]
+
+    asyncio.run(main())
+
+
+def test_full_queue_is_rejected_with_429():
+    async def main():
+        c = controller(max_queue=1)
+        await c.acquire("ledger")
+        waiter = asyncio.create_task(c.acquire("ledger"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as e:
+            await c.acquire("ledger")
+        waiter.cancel()
+        return e.value
+
+    assert asyncio.run(main()).status_code == 429
+
+
+def test_waiter_past_deadline_is_shed_with_503():
+    async def main():
+        c = controller(deadline=0.01)
+        await c.acquire("ledger")
+        with pytest.raises(HTTPException) as e:
+            await c.acquire("ledger")
+        assert c.stats()["classes"]["ledger"]["queue_length"] == 0
+        assert c.stats()["classes"]["ledger"]["timed_out"] == 1
+        return e.value
+
+    assert asyncio.run(main()).status_code == 503
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    return fake
+
+
+def test_concurrent_identical_loads_call_loader_once():
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "check balance"
+
+    async def main():
+        c = TTLCache(maxsize=10, ttl=60)
+        results = await asyncio.gather(*(c.get_or_load("audio", loader) for _ in range(10)))
+        return c, results
+
+    c, results = asyncio.run(main())
+    assert calls == 1
+    assert results == ["check balance"] * 10
+    assert c.stats()["misses"] == 1
+    assert c.stats()["coalesced"] == 9
+
+
+def test_entries_expire_after_ttl(clock):
+    c = TTLCache(maxsize=10, ttl=60)
+    c.set("a", 1)
+    clock.now += 59
+    assert c.get("a") == 1
+    clock.now += 2
+    assert c.get("a") is None
+    assert c.stats()["size"] == 0
+
+
+def test_maxsize_evicts_least_recently_used():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+
+
+def test_failed_load_is_not_cached():
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("transcription failed")
+
+    async def succeeding():
+        return "ok"
+
+    async def main():
+        c = TTLCache(maxsize=10, ttl=60)
+        results = await asyncio.gather(
+            *(c.get_or_load("audio", failing) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+        assert c.get("audio") is None
+        assert c.stats()["in_flight"] == 0
+        return await c.get_or_load("audio", succeeding)
+
+    assert asyncio.run(main()) == "ok"
+    assert calls == 1
+
+
+def test_hit_rate_counts_hits_and_coalesced_loads():
+    async def loader():
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        c = TTLCache(maxsize=10, ttl=60)
+        await asyncio.gather(c.get_or_load("k", loader), c.get_or_load("k", loader))
+        await c.get_or_load("k", loader)
+        await c.get_or_load("other", loader)
+        return c.stats()
+
+    stats = asyncio.run(main())
+    assert stats["misses"] == 2
+    assert stats["coalesced"] == 1
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 0.5
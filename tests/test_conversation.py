@@ -0,0 +1,95 @@
+import pytest
+
+import conversation
+from conversation import ConversationState, ConversationStore, extract_entities
+from store import SQLiteSharedStore
+
+CATEGORIES = ["electricity", "water"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(conversation.time, "time", fake)
+    return fake
+
+
+def state(intent="transfer_money", entities=None):
+    return ConversationState(intent, entities, "en", 0)
+
+
+def test_states_expire_after_ttl(clock):
+    store = ConversationStore(ttl=300)
+    store.set("u1", state())
+    clock.now += 299
+    assert store.get("u1") is not None
+    clock.now += 2
+    assert store.get("u1") is None
+    assert store.stats()["expired"] == 1
+
+
+def test_expired_states_are_swept_on_write(clock):
+    store = ConversationStore(ttl=300)
+    store.set("u1", state())
+    store.set("u2", state())
+    clock.now += 301
+    store.set("u3", state())
+    assert store.stats()["sessions"] == 1
+    assert store.stats()["expired"] == 2
+
+
+def test_size_cap_evicts_least_recently_written(clock):
+    store = ConversationStore(max_sessions=2, ttl=300)
+    store.set("u1", state())
+    store.set("u2", state())
+    store.set("u1", state("pay_bill"))
+    store.set("u3", state())
+    assert store.get("u2") is None
+    assert store.get("u1").intent == "pay_bill"
+    assert store.get("u3") is not None
+    assert store.stats()["evicted"] == 1
+
+
+def test_shared_store_round_trip(tmp_path):
+    backend = SQLiteSharedStore(str(tmp_path / "shared_store.db"))
+    store = ConversationStore(ttl=300, backend=backend)
+    other_worker = ConversationStore(ttl=300, backend=SQLiteSharedStore(str(tmp_path / "shared_store.db")))
+
+    store.set("u1", ConversationState("transfer_money", {"amount": 500.0}, "hi", 0))
+    loaded = other_worker.get("u1")
+    assert (loaded.intent, loaded.entities, loaded.language) == ("transfer_money", {"amount": 500.0}, "hi")
+    assert loaded.missing() == ["recipient"]
+
+    other_worker.clear("u1")
+    assert store.get("u1") is None
+
+
+def test_missing_slots_and_merge():
+    pending = state()
+    assert pending.missing() == ["recipient", "amount"]
+    pending.merge({"amount": 500.0})
+    pending.merge({})
+    assert pending.entities == {"amount": 500.0}
+    assert pending.missing() == ["recipient"]
+
+
+@pytest.mark.parametrize("text, expecting, entities", [
+    ("send 500 rupees to Ramesh Kumar", (), {"amount": 500.0, "recipient": "ramesh kumar"}),
+    ("I want to send money", (), {}),
+    ("pay electricity bill 1,200.50", (), {"amount": 1200.5, "bill_type": "electricity"}),
+    ("Ramesh", (), {}),
+    ("Ramesh", ("recipient",), {"recipient": "ramesh"}),
+    ("it's Ravi, 300 rupees", ("recipient", "amount"), {"amount": 300.0, "recipient": "ravi"}),
+    ("500 rupees", ("recipient", "amount"), {"amount": 500.0}),
+    ("yes", ("recipient",), {}),
+])
+def test_extract_entities(text, expecting, entities):
+    assert extract_entities(text, CATEGORIES, expecting) == entities
@@ -0,0 +1,175 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+import ledger as ledger_ops
+from database import Account, Counterparty, Transaction
+from directory import (
+    DirectoryEntry, RecipientDirectory, UserDirectory, backfill_counterparties, is_confident, normalize,
+    phonetic_key, record_counterparty, soundex, transliterate
+)
+
+
+def test_transliterate():
+    assert transliterate("रमेश") == "ramesh"
+    # Long vowel signs and independent vowels
+    assert transliterate("राम") == "raam"
+    assert transliterate("अनिल कुमार") == "anil kumaar"
+    # Virama joins consonants without the inherent vowel
+    assert transliterate("लक्ष्मी") == "lakshmee"
+    # Nukta forms read as their base consonant
+    assert transliterate("ज़ैनब") == "jainab"
+    assert transliterate("Ramesh") == "Ramesh"
+
+
+def test_normalize_folds_spellings():
+    assert normalize("लक्ष्मी") == normalize("Lakshmee") == "lakshmi"
+    assert normalize("कुमार") == "kumar"
+    assert normalize("  Ramesh-Kumar! ") == "ramesh kumar"
+
+
+def test_soundex():
+    assert soundex("robert") == soundex("rupert") == "R163"
+    assert soundex("tymczak") == "T522"
+    assert soundex("pfister") == "P236"
+    assert soundex("") == ""
+
+
+def test_phonetic_key():
+    assert phonetic_key("lakshmi") == phonetic_key("laxmi") == "lksm"
+    assert phonetic_key("priya") == phonetic_key("preeya")
+    assert phonetic_key("ramesh") == phonetic_key("rameesh")
+    assert phonetic_key("") == ""
+
+
+@pytest.fixture
+def directory():
+    directory = UserDirectory()
+    for transfer_count, (name, phone) in enumerate([
+        ("Ramesh Kumar", "9000011111"),
+        ("Rakesh Sharma", "9000022222"),
+        ("Suresh Kumar", "9000033333"),
+        ("Lakshmi", "9000044444"),
+    ]):
+        directory.add(DirectoryEntry(str(transfer_count), name, phone, transfer_count=transfer_count))
+    return directory
+
+
+def names(results):
+    return [r["name"] for r in results]
+
+
+def test_search_ranks_closest_name_first(directory):
+    assert names(directory.search("ramesh")) == ["Ramesh Kumar", "Rakesh Sharma"]
+    assert names(directory.search("Rameesh"))[0] == "Ramesh Kumar"
+    assert names(directory.search("रमेश"))[0] == "Ramesh Kumar"
+    assert names(directory.search("laxmi")) == ["Lakshmi"]
+    # Equal matches prefer the recipient paid more often
+    assert names(directory.search("kumar")) == ["Suresh Kumar", "Ramesh Kumar"]
+
+
+def test_search_drops_weak_matches(directory):
+    assert directory.search("mohan") == []
+    # "rohit" shares a trigram with Ramesh but scores below 0.3
+    assert directory.search("rohit") == []
+    assert all(r["score"] >= 0.3 for r in directory.search("ravi"))
+
+
+def test_search_by_partial_phone(directory):
+    assert names(directory.search("22222")) == ["Rakesh Sharma"]
+    assert directory.search("22222")[0]["score"] == 1.0
+    assert names(directory.search("9000", limit=2)) == ["Lakshmi", "Suresh Kumar"]
+
+
+def test_is_confident(directory):
+    assert is_confident(directory.search("ramesh"))
+    assert not is_confident(directory.search("kumar"))
+    assert not is_confident([])
+    assert not is_confident([{"score": 0.9}])
+
+
+@pytest.fixture
+def people(ledger_db, make_user):
+    payer = make_user("Asha", shard=0)
+    ramesh = make_user("Ramesh Kumar", shard=1)
+    suresh = make_user("Suresh Kumar", shard=0)
+    ledger_ops.transfer(ledger_db, payer, ramesh, 10.0)
+    ledger_ops.transfer(ledger_db, payer, suresh, 10.0)
+    return payer, ramesh, suresh
+
+
+def test_transfers_record_counterparties_on_owner_shard(ledger_db, people):
+    payer, ramesh, suresh = people
+    ledger_ops.transfer(ledger_db, payer, ramesh, 10.0)
+
+    session = ledger_db.session(payer.user_id)
+    assert session.get(Counterparty, (payer.user_id, ramesh.user_id)).transfer_count == 2
+    assert session.get(Counterparty, (payer.user_id, suresh.user_id)).transfer_count == 1
+    # Nothing is written to the main database
+    assert ledger_db.db.query(Counterparty).count() == 0
+
+
+def test_resolve_by_name(ledger_db, people):
+    payer, ramesh, suresh = people
+    recipients = RecipientDirectory()
+
+    assert recipients.resolve(ledger_db, payer.user_id, "ramesh").user_id == ramesh.user_id
+
+    with pytest.raises(HTTPException) as e:
+        recipients.resolve(ledger_db, payer.user_id, "kumar")
+    assert e.value.status_code == 409
+    assert {c["user_id"] for c in e.value.detail["candidates"]} == {ramesh.user_id, suresh.user_id}
+
+    with pytest.raises(HTTPException) as e:
+        recipients.resolve(ledger_db, payer.user_id, "mohan")
+    assert e.value.status_code == 404
+
+
+def test_record_transfer_updates_loaded_index(ledger_db, people):
+    payer, ramesh, suresh = people
+    recipients = RecipientDirectory()
+    assert recipients.search(ledger_db, payer.user_id, "ramesh")[0]["transfer_count"] == 1
+
+    recipients.record_transfer(payer.user_id, ramesh)
+
+    assert recipients.search(ledger_db, payer.user_id, "ramesh")[0]["transfer_count"] == 2
+
+
+def test_index_reloads_after_ttl(ledger_db, people, make_user):
+    payer, ramesh, suresh = people
+    cached, expiring = RecipientDirectory(), RecipientDirectory(ttl=0)
+    for recipients in (cached, expiring):
+        recipients.search(ledger_db, payer.user_id, "lakshmi")
+
+    # A transfer made by another worker
+    lakshmi = make_user("Lakshmi", shard=1)
+    session = ledger_db.session(payer.user_id)
+    record_counterparty(session, payer.user_id, lakshmi.user_id, None)
+    session.commit()
+
+    assert cached.search(ledger_db, payer.user_id, "lakshmi") == []
+    assert names(expiring.search(ledger_db, payer.user_id, "lakshmi")) == ["Lakshmi"]
+
+
+def test_backfill_skips_shared_names(ledger_db, make_user):
+    payer = make_user("Asha", shard=0)
+    ravi = make_user("Ravi", shard=1)
+    make_user("Meena", shard=0)
+    make_user("Meena", shard=1)
+    session = ledger_db.session(payer.user_id)
+    account = session.query(Account).filter(Account.user_id == payer.user_id).one()
+    # Debits from before counterparties were recorded
+    for recipient in ("Ravi", "Ravi", "Meena", "Asha", "electricity"):
+        session.add(Transaction(
+            transaction_id=str(uuid.uuid4()), account_id=account.account_id, type="debit",
+            amount=10.0, recipient=recipient
+        ))
+    session.commit()
+
+    assert backfill_counterparties(ledger_db) == 1
+    assert session.query(Counterparty).one().recipient_user_id == ravi.user_id
+    assert session.query(Counterparty).one().transfer_count == 2
+    # Running again seeds nothing new
+    assert backfill_counterparties(ledger_db) == 0
+    assert ledger_db.db.query(Counterparty).count() == 0
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import events
+import ledger as ledger_ops
+from database import Account
+from events import EventBus, PENDING_KEY
+
+
+def account_of(ledger, user):
+    return ledger.session(user.user_id).query(Account).filter(Account.user_id == user.user_id).one()
+
+
+def test_events_are_not_kept_without_a_bus(ledger_db, make_user, monkeypatch):
+    monkeypatch.setattr(events, "_installed", False)
+    payer = make_user("Asha")
+    session = ledger_db.session(payer.user_id)
+
+    ledger_ops.stage_bill_payment(session, account_of(ledger_db, payer), "water", 10.0)
+
+    assert PENDING_KEY not in session.info
+    session.commit()
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = EventBus(queue_size=2)
+    # Listeners are global to Session, so remove them again after the test
+    monkeypatch.setattr(events, "_installed", False)
+    bus.install()
+    yield bus
+    events.event.remove(events.Session, "after_commit", bus._after_commit)
+    events.event.remove(events.Session, "after_rollback", bus._after_rollback)
+
+
+def test_committed_writes_reach_subscribers(ledger_db, make_user, bus):
+    payer = make_user("Asha")
+
+    async def main():
+        bus.start()
+        queue = bus.subscribe(payer.user_id)
+        session = ledger_db.session(payer.user_id)
+        for bill_type in ("water", "gas", "rent"):
+            ledger_ops.stage_bill_payment(session, account_of(ledger_db, payer), bill_type, 10.0)
+        session.commit()
+
+        # A rolled back write publishes nothing
+        ledger_ops.stage_bill_payment(session, account_of(ledger_db, payer), "phone", 10.0)
+        session.rollback()
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    received = asyncio.run(main())
+    # The queue keeps the newest events when a subscriber falls behind
+    assert [e["transaction"]["recipient"] for e in received] == ["gas", "rent"]
+    assert received[-1]["balance"] == 9970.0
+    assert bus.stats()["dropped"] == 1
+
+
+class FailingBackend:
+    def append_event(self, user_id, payload):
+        raise RuntimeError("database is locked")
+
+
+def test_failed_publish_does_not_fail_the_commit(ledger_db, make_user, balance_of, monkeypatch):
+    bus = EventBus(backend=FailingBackend())
+    monkeypatch.setattr(events, "_installed", False)
+    bus.install()
+    try:
+        sender = make_user("Asha", shard=0)
+        recipient = make_user("Ravi", shard=1)
+
+        # A raise here would abort the intent after the debit committed
+        debit = ledger_ops.transfer(ledger_db, sender, recipient, 250.0)
+    finally:
+        events.event.remove(events.Session, "after_commit", bus._after_commit)
+        events.event.remove(events.Session, "after_rollback", bus._after_rollback)
+
+    assert debit.status == "completed"
+    assert balance_of(sender) == 9750.0
+    assert balance_of(recipient) == 10250.0
@@ -0,0 +1,70 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import insights
+import ledger as ledger_ops
+import scheduler
+from database import Account, SpendingRollup, StandingInstruction
+
+
+def account_of(ledger, user):
+    return ledger.session(user.user_id).query(Account).filter(Account.user_id == user.user_id).one()
+
+
+def month_summary(ledger, user, category=insights.ALL):
+    account = account_of(ledger, user)
+    month = insights.period_keys(datetime.now(timezone.utc))["month"]
+    return insights.lookup(ledger.session(user.user_id), account.account_id, "debit", "month", month, category)
+
+
+def rollup_rows(session):
+    session.expire_all()
+    return sorted(
+        (r.account_id, r.type, r.period, r.period_key, r.category, r.total, r.count)
+        for r in session.query(SpendingRollup)
+    )
+
+
+def bill(bill_type, amount):
+    return SimpleNamespace(type="bill_pay", bill_type=bill_type, amount=amount, recipient_phone=None, description=None)
+
+
+def test_batch_with_several_items_in_a_new_bucket(ledger_db, make_user):
+    payer = make_user("Asha")
+
+    results = ledger_ops.apply_batch(ledger_db, payer, [bill("electricity", 120.0), bill("water", 30.0)], {})
+
+    assert [r["status"] for r in results] == ["completed", "completed"]
+    assert month_summary(ledger_db, payer) == {"total": 150.0, "count": 2}
+    assert month_summary(ledger_db, payer, "water") == {"total": 30.0, "count": 1}
+
+
+def test_scheduler_chunk_with_several_bills_on_one_account(ledger_db, make_user):
+    payer = make_user("Asha")
+    now = datetime.now(timezone.utc)
+    for bill_type in ("electricity", "water"):
+        ledger_db.db.add(StandingInstruction(
+            instruction_id=str(uuid.uuid4()), user_id=payer.user_id, type="bill_pay",
+            bill_type=bill_type, amount=100.0, frequency="monthly", next_run_at=now - timedelta(minutes=1)
+        ))
+    ledger_db.db.commit()
+
+    assert scheduler.run_due_instructions(now=now) == {"completed": 2, "failed": 0}
+    assert month_summary(ledger_db, payer) == {"total": 200.0, "count": 2}
+
+
+def test_rollups_match_a_rebuild(ledger_db, make_user):
+    payer = make_user("Asha", shard=0)
+    friend = make_user("Ravi", shard=0)
+    ledger_ops.apply_batch(ledger_db, payer, [bill("Electricity", 120.0), bill("electricity", 10.0)], {})
+    ledger_ops.transfer(ledger_db, payer, friend, 50.0)
+
+    session = ledger_db.shard_session(0)
+    incremental = rollup_rows(session)
+    insights.rebuild_rollups(session)
+
+    assert rollup_rows(session) == incremental
+    month = insights.period_keys(datetime.now(timezone.utc))["month"]
+    top = insights.top_categories(session, account_of(ledger_db, payer).account_id, "debit", "month", month)
+    assert top[0] == {"category": "electricity", "total": 130.0, "count": 2}
@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import database
+import ledger as ledger_ops
+from database import Account, Transaction, TransferIntent
+
+
+@pytest.mark.parametrize("ledger_db", [1, 2], indirect=True)
+def test_same_shard_transfer(ledger_db, make_user, balance_of):
+    sender = make_user("Asha")
+    recipient = make_user("Ravi")
+
+    debit = ledger_ops.transfer(ledger_db, sender, recipient, 250.0)
+
+    assert debit.status == "completed"
+    assert balance_of(sender) == 9750.0
+    assert balance_of(recipient) == 10250.0
+    assert ledger_db.db.query(TransferIntent).count() == 0
+
+
+def test_updated_balance_stays_a_float(ledger_db, make_user):
+    payer = make_user("Asha")
+    session = ledger_db.session(payer.user_id)
+    account = session.query(Account).filter(Account.user_id == payer.user_id).one()
+
+    ledger_ops.stage_bill_payment(session, account, "water", 25.0)
+
+    # Pushed events carry this value, so 9975 must not become an int
+    assert account.balance == 9975.0
+    assert isinstance(account.balance, float)
+
+
+def test_cross_shard_transfer(ledger_db, make_user, balance_of):
+    sender = make_user("Asha", shard=0)
+    recipient = make_user("Ravi", shard=1)
+
+    debit = ledger_ops.transfer(ledger_db, sender, recipient, 250.0)
+
+    assert debit.status == "completed"
+    assert balance_of(sender) == 9750.0
+    assert balance_of(recipient) == 10250.0
+    intent = ledger_db.db.get(TransferIntent, debit.transaction_id)
+    assert intent.status == "completed"
+    credit = ledger_db.session(recipient.user_id).get(Transaction, ledger_ops.credit_id_for(debit.transaction_id))
+    assert credit.amount == 250.0
+
+
+def test_cross_shard_transfer_aborts_on_insufficient_balance(ledger_db, make_user, balance_of):
+    sender = make_user("Asha", balance=100.0, shard=0)
+    recipient = make_user("Ravi", shard=1)
+
+    with pytest.raises(HTTPException) as e:
+        ledger_ops.transfer(ledger_db, sender, recipient, 250.0)
+
+    assert e.value.status_code == 400
+    assert ledger_db.db.query(TransferIntent).one().status == "aborted"
+    assert ledger_db.session(sender.user_id).query(Transaction).count() == 0
+    assert balance_of(sender) == 100.0
+    assert balance_of(recipient) == 10000.0
+
+
+def fail_once(monkeypatch):
+    original = ledger_ops.complete_transfer
+
+    def failing(*args):
+        monkeypatch.setattr(ledger_ops, "complete_transfer", original)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(ledger_ops, "complete_transfer", failing)
+
+
+def test_recovery_rolls_forward_a_debited_transfer(ledger_db, make_user, balance_of, monkeypatch):
+    sender = make_user("Asha", shard=0)
+    recipient = make_user("Ravi", shard=1)
+    fail_once(monkeypatch)
+
+    debit = ledger_ops.transfer(ledger_db, sender, recipient, 250.0)
+    assert debit.status == "pending"
+    assert balance_of(sender) == 9750.0
+    assert balance_of(recipient) == 10000.0
+
+    assert ledger_ops.recover_transfers(ledger_db, min_age=0) == 1
+    assert ledger_db.db.get(TransferIntent, debit.transaction_id).status == "completed"
+    assert balance_of(recipient) == 10250.0
+    # Running again finds nothing left to do
+    assert ledger_ops.recover_transfers(ledger_db, min_age=0) == 0
+    assert balance_of(recipient) == 10250.0
+
+
+def test_recovery_aborts_intent_that_was_never_debited(ledger_db, make_user, balance_of):
+    sender = make_user("Asha", shard=0)
+    recipient = make_user("Ravi", shard=1)
+    ledger_db.db.add(TransferIntent(
+        transfer_id="t1", sender_user_id=sender.user_id, recipient_user_id=recipient.user_id,
+        amount=10.0, status="pending"
+    ))
+    ledger_db.db.commit()
+
+    assert ledger_ops.recover_transfers(ledger_db, min_age=0) == 0
+    assert ledger_db.db.get(TransferIntent, "t1").status == "aborted"
+
+
+def test_failed_recovery_is_logged_and_released(ledger_db, make_user, balance_of, monkeypatch):
+    sender = make_user("Asha", shard=0)
+    recipient = make_user("Ravi", shard=1)
+    fail_once(monkeypatch)
+    debit = ledger_ops.transfer(ledger_db, sender, recipient, 250.0)
+
+    fail_once(monkeypatch)
+    assert ledger_ops.recover_transfers(ledger_db, min_age=0) == 0
+    assert ledger_db.db.get(TransferIntent, debit.transaction_id).status == "pending"
+
+    assert ledger_ops.recover_transfers(ledger_db, min_age=0) == 1
+    assert balance_of(recipient) == 10250.0
+
+
+def test_claims_are_exclusive_until_stale(ledger_db, make_user, balance_of):
+    sender = make_user("Asha", shard=0)
+    recipient = make_user("Ravi", shard=1)
+    ledger_db.db.add(TransferIntent(
+        transfer_id="t1", sender_user_id=sender.user_id, recipient_user_id=recipient.user_id,
+        amount=10.0, status="pending"
+    ))
+    ledger_db.db.commit()
+    now = datetime.now(timezone.utc)
+
+    assert ledger_ops.claim_transfer(ledger_db.db, "t1", now - timedelta(seconds=60))
+    assert not ledger_ops.claim_transfer(ledger_db.db, "t1", now - timedelta(seconds=60))
+    # A claim older than the cutoff belongs to a process that died
+    assert ledger_ops.claim_transfer(ledger_db.db, "t1", now + timedelta(seconds=60))
+
+
+def test_concurrent_debits_are_not_lost(ledger_db, make_user, balance_of):
+    payer = make_user("Asha", balance=10000.0)
+    first, second = database.LedgerSessions[0](), database.LedgerSessions[0]()
+    try:
+        # Both sessions read the same balance before either writes
+        accounts = [s.query(Account).filter(Account.user_id == payer.user_id).one() for s in (first, second)]
+        for session, account in zip((first, second), accounts):
+            ledger_ops.stage_bill_payment(session, account, "electricity", 100.0)
+            session.commit()
+    finally:
+        first.close()
+        second.close()
+
+    assert balance_of(payer) == 9800.0
+
+
+def test_concurrent_debits_cannot_overdraw(ledger_db, make_user, balance_of):
+    payer = make_user("Asha", balance=150.0)
+    first, second = database.LedgerSessions[0](), database.LedgerSessions[0]()
+    try:
+        accounts = [s.query(Account).filter(Account.user_id == payer.user_id).one() for s in (first, second)]
+        ledger_ops.stage_bill_payment(first, accounts[0], "electricity", 100.0)
+        first.commit()
+        with pytest.raises(HTTPException):
+            ledger_ops.stage_bill_payment(second, accounts[1], "water", 100.0)
+        second.rollback()
+    finally:
+        first.close()
+        second.close()
+
+    assert balance_of(payer) == 50.0
+
+
+def item(type, amount, recipient_phone=None, bill_type=None):
+    return SimpleNamespace(type=type, amount=amount, recipient_phone=recipient_phone, bill_type=bill_type, description=None)
+
+
+def test_batch_reports_each_item(ledger_db, make_user, balance_of):
+    payer = make_user("Asha", balance=1000.0, shard=0)
+    local = make_user("Ravi", shard=0)
+    remote = make_user("Meena", shard=1)
+    recipients = {local.phone: local, remote.phone: remote}
+
+    results = ledger_ops.apply_batch(ledger_db, payer, [
+        item("bill_pay", 100.0, bill_type="electricity"),
+        item("bill_pay", 50.0),
+        item("transfer", 10.0, recipient_phone="0000000000"),
+        item("transfer", 5000.0, recipient_phone=local.phone),
+        item("transfer", 200.0, recipient_phone=local.phone),
+        item("transfer", 300.0, recipient_phone=remote.phone),
+    ], recipients)
+
+    assert [(r["index"], r["status"], r.get("error")) for r in results] == [
+        (0, "completed", None),
+        (1, "failed", "bill_type is required"),
+        (2, "failed", "Recipient not found"),
+        (3, "failed", "Insufficient balance"),
+        (4, "completed", None),
+        (5, "completed", None),
+    ]
+    assert balance_of(payer) == 400.0
+    assert balance_of(local) == 10200.0
+    assert balance_of(remote) == 10300.0
+
+
+@pytest.mark.parametrize("shard", [0, 1])
+def test_transfer_to_user_without_account_debits_nothing(ledger_db, make_user, balance_of, shard):
+    sender = make_user("Asha", shard=0)
+    recipient = make_user("Ravi", shard=shard)
+    session = ledger_db.session(recipient.user_id)
+    session.query(Account).filter(Account.user_id == recipient.user_id).delete()
+    session.commit()
+
+    with pytest.raises(HTTPException) as e:
+        ledger_ops.transfer(ledger_db, sender, recipient, 250.0)
+
+    assert (e.value.status_code, e.value.detail) == (404, "Recipient account not found")
+    assert balance_of(sender) == 10000.0
+    assert ledger_db.db.query(TransferIntent).count() == 0
@@ -0,0 +1,83 @@
+import pytest
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.testclient import TestClient
+
+from admission import AdmissionController, admit
+from ratelimit import MemoryRateLimitStore, RateLimiter, RateLimitStore, sliding_window
+
+
+def test_sliding_window_allows_limit_then_rejects():
+    state = (0.0, 0, 0)
+    for _ in range(3):
+        *state, retry_after = sliding_window(*state, 100.0, 3, 60)
+        assert retry_after == 0
+    *_, retry_after = sliding_window(*state, 100.0, 3, 60)
+    assert retry_after > 0
+
+
+def test_previous_window_counts_by_overlap():
+    # 4 hits in the previous window, a quarter of which still overlaps
+    window_start, previous, current, retry_after = sliding_window(60.0, 0, 4, 165.0, 3, 60)
+    assert (window_start, previous, current, retry_after) == (120.0, 4, 1, 0)
+    # Three quarters still overlap: 4 * 0.75 + 1 + 1 > 3
+    assert sliding_window(60.0, 0, 4, 135.0, 3, 60)[3] > 0
+
+
+def test_store_must_implement_hit():
+    class Incomplete(RateLimitStore):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def app_with(limiter, admission=None):
+    async def phone(request: Request):
+        return (await request.json()).get("phone")
+
+    dependencies = [limiter.by_client_ip("ip"), limiter.by_key("phone", phone)]
+    if admission is not None:
+        dependencies.append(admit(admission, "auth"))
+
+    router = APIRouter()
+
+    @router.post("/login", dependencies=dependencies)
+    async def login(request: Request):
+        return {"client": limiter.client_ip(request)}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def test_phone_rejection_happens_before_admission():
+    limiter = RateLimiter(MemoryRateLimitStore())
+    limiter.add_rule("ip", 100, 60)
+    limiter.add_rule("phone", 1, 60)
+    admission = AdmissionController(total_limit=4)
+    admission.add_class("auth", limit=1, max_queue=1, deadline=1, priority=0)
+    client = TestClient(app_with(limiter, admission))
+
+    assert client.post("/login", json={"phone": "9000000001"}).status_code == 200
+    assert client.post("/login", json={"phone": "9000000001"}).status_code == 429
+    assert admission.stats()["classes"]["auth"]["admitted"] == 1
+    assert client.post("/login", json={"phone": "9000000002"}).status_code == 200
+
+
+def request_from(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 50000), "headers": headers})
+
+
+def test_forwarded_client_ip_is_used_only_from_trusted_proxies():
+    limiter = RateLimiter(MemoryRateLimitStore(), trusted_proxies="10.0.0.0/8, 127.0.0.1")
+
+    assert limiter.client_ip(request_from("203.0.113.9", "6.6.6.6")) == "203.0.113.9"
+    assert limiter.client_ip(request_from("10.1.2.3")) == "10.1.2.3"
+    # Addresses added by our own proxies are skipped; earlier ones could be spoofed
+    assert limiter.client_ip(request_from("10.1.2.3", "6.6.6.6, 203.0.113.9, 10.0.0.7")) == "203.0.113.9"
+
+
+def test_untrusted_by_default():
+    limiter = RateLimiter(MemoryRateLimitStore())
+    assert limiter.client_ip(request_from("10.1.2.3", "203.0.113.9")) == "10.1.2.3"
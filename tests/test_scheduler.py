@@ -0,0 +1,119 @@
+import uuid
+from datetime import datetime, timedelta
+
+import scheduler
+from database import StandingInstruction, Transaction, TransferIntent
+
+NOW = datetime(2026, 10, 1, 9, 0)
+
+
+def test_monthly_runs_keep_the_anchor_day():
+    run_at = datetime(2026, 1, 31, 9, 0)
+    runs = []
+    for _ in range(4):
+        run_at = scheduler.advance(run_at, "monthly", anchor_day=31)
+        runs.append(run_at.date().isoformat())
+    assert runs == ["2026-02-28", "2026-03-31", "2026-04-30", "2026-05-31"]
+
+
+def test_daily_weekly_and_year_end():
+    assert scheduler.advance(datetime(2026, 12, 31), "daily") == datetime(2027, 1, 1)
+    assert scheduler.advance(datetime(2026, 12, 31), "weekly") == datetime(2027, 1, 7)
+    assert scheduler.advance(datetime(2026, 12, 15), "monthly") == datetime(2027, 1, 15)
+
+
+def add_instruction(ledger, user, next_run_at=NOW - timedelta(minutes=1), frequency="monthly", **fields):
+    fields.setdefault("type", "bill_pay")
+    fields.setdefault("bill_type", "electricity")
+    instruction = StandingInstruction(
+        instruction_id=str(uuid.uuid4()), user_id=user.user_id, amount=100.0,
+        frequency=frequency, start_at=next_run_at, next_run_at=next_run_at, **fields
+    )
+    ledger.db.add(instruction)
+    ledger.db.commit()
+    return instruction.instruction_id
+
+
+def instruction(ledger, instruction_id):
+    ledger.db.expire_all()
+    return ledger.db.get(StandingInstruction, instruction_id)
+
+
+def test_run_advances_past_now_and_skips_missed_runs(ledger_db, make_user, balance_of):
+    payer = make_user("Asha")
+    instruction_id = add_instruction(ledger_db, payer, next_run_at=NOW - timedelta(days=3), frequency="daily")
+
+    assert scheduler.run_due_instructions(now=NOW) == {"completed": 1, "failed": 0}
+
+    ran = instruction(ledger_db, instruction_id)
+    assert ran.last_status == "completed"
+    assert ran.next_run_at == NOW + timedelta(days=1)
+    assert balance_of(payer) == 9900.0
+
+
+def test_monthly_instruction_returns_to_its_start_day(ledger_db, make_user):
+    payer = make_user("Asha")
+    instruction_id = add_instruction(ledger_db, payer, next_run_at=datetime(2026, 2, 28, 9, 0))
+    ran = instruction(ledger_db, instruction_id)
+    ran.start_at = datetime(2026, 1, 31, 9, 0)
+    ledger_db.db.commit()
+
+    scheduler.run_due_instructions(now=datetime(2026, 2, 28, 10, 0))
+    assert instruction(ledger_db, instruction_id).next_run_at == datetime(2026, 3, 31, 9, 0)
+
+
+def test_chunks_cover_every_due_instruction_once(ledger_db, make_user, balance_of):
+    payers = [make_user(f"User {i}") for i in range(5)]
+    for payer in payers:
+        add_instruction(ledger_db, payer)
+
+    assert scheduler.run_due_instructions(now=NOW, chunk_size=2) == {"completed": 5, "failed": 0}
+    assert scheduler.run_due_instructions(now=NOW, chunk_size=2) == {"completed": 0, "failed": 0}
+    assert [balance_of(payer) for payer in payers] == [9900.0] * 5
+
+
+def test_failures_are_recorded_per_instruction(ledger_db, make_user, balance_of):
+    payer = make_user("Asha", balance=150.0)
+    first = add_instruction(ledger_db, payer, next_run_at=NOW - timedelta(minutes=2))
+    second = add_instruction(ledger_db, payer, bill_type="water")
+
+    assert scheduler.run_due_instructions(now=NOW) == {"completed": 1, "failed": 1}
+    assert instruction(ledger_db, first).last_status == "completed"
+    assert instruction(ledger_db, second).last_status == "failed: Insufficient balance"
+    assert instruction(ledger_db, second).next_run_at > NOW
+
+
+def replay(ledger, instruction_id, next_run_at):
+    # As if the process died after the ledger commit but before the
+    # instruction's next_run_at was saved
+    ran = instruction(ledger, instruction_id)
+    ran.next_run_at = next_run_at
+    ledger.db.commit()
+
+
+def test_replayed_bill_run_is_not_paid_twice(ledger_db, make_user, balance_of):
+    payer = make_user("Asha")
+    due = NOW - timedelta(minutes=1)
+    instruction_id = add_instruction(ledger_db, payer, next_run_at=due)
+    scheduler.run_due_instructions(now=NOW)
+
+    replay(ledger_db, instruction_id, due)
+    assert scheduler.run_due_instructions(now=NOW) == {"completed": 1, "failed": 0}
+    assert balance_of(payer) == 9900.0
+    assert ledger_db.session(payer.user_id).query(Transaction).count() == 1
+
+
+def test_replayed_cross_shard_run_is_not_paid_twice(ledger_db, make_user, balance_of):
+    payer = make_user("Asha", shard=0)
+    friend = make_user("Ravi", shard=1)
+    due = NOW - timedelta(minutes=1)
+    instruction_id = add_instruction(
+        ledger_db, payer, next_run_at=due, type="transfer", bill_type=None, recipient_user_id=friend.user_id
+    )
+    scheduler.run_due_instructions(now=NOW)
+
+    replay(ledger_db, instruction_id, due)
+    assert scheduler.run_due_instructions(now=NOW) == {"completed": 1, "failed": 0}
+    assert balance_of(payer) == 9900.0
+    assert balance_of(friend) == 10100.0
+    assert ledger_db.db.query(TransferIntent).count() == 1
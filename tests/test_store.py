@@ -0,0 +1,25 @@
+import time
+
+from store import SQLiteSharedStore
+
+
+def rows(store, table):
+    return store._conn().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_expired_rows_are_purged_as_the_store_is_written(tmp_path, monkeypatch):
+    store = SQLiteSharedStore(str(tmp_path / "shared_store.db"), purge_every=3)
+    store.set("old", "transcript", ttl=-1)
+    store.hit("login_ip:10.0.0.1", limit=5, window=60)
+    store.set("live", "transcript", ttl=60)
+    assert store.get("old") is None
+    assert rows(store, "kv") == 1
+
+    # A day later the rate-limit row is stale too
+    later = time.time() + 86400 * 2
+    monkeypatch.setattr(time, "time", lambda: later)
+    for key in ("a", "b", "c"):
+        store.set(key, "transcript", ttl=60)
+
+    assert rows(store, "kv") == 3
+    assert rows(store, "rate_limits") == 0